@@ -108,10 +108,14 @@ def get_better_products_in_price_range(price_alts, item_price, tolerance):
 #     #     ])
 
 # ...existing code...
+import numpy as np
 import pandas as pd
-from .common_code import calculate_product_score  # relative import
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from .common_code import score_products  # relative import
+from .ranking import top_k_indices
+from . import workable_data
+from . import neighbors
+from . import metrics
+from .responses import catalog_ids
 from bson import ObjectId, Binary
 from datetime import datetime
 import base64
@@ -226,79 +230,126 @@ def _to_jsonable(v):
 
 #     # --- Step 10: JSON-safe return ---
 #     return [{k: _to_jsonable(v) for k, v in rec.items()} for rec in out.to_dict(orient="records")]
-def cart_alternatives(profile, product_id, df, top_k=10):
-    """Recommend more sustainable alternatives for a given product_id."""
+@metrics.timed("cart.total")
+def cart_alternatives(profile, product_id, df, top_k=10, max_results=None):
+    """Recommend more sustainable alternatives for a given product_id.
+
+    `top_k` is how many candidates the price window widens to find;
+    `max_results` is how many ranked ids to return (defaults to top_k).
+    """
     # Validate inputs
     if not isinstance(df, pd.DataFrame) or df.empty:
         return []
     if not product_id or "product_id" not in df.columns:
         return []
 
-    # Normalize for comparison
+    # Normalize for comparison (the loaded catalog already stores product_id as str)
     product_id = str(product_id)
-    df = df.copy()
-    df["product_id"] = df["product_id"].astype(str)
-
-    if product_id not in df["product_id"].values:
+    snapshot = workable_data.catalog()
+    live = df is snapshot.workable_dataset
+    product_ids = df["product_id"] if live else df["product_id"].astype(str)
+    ids = product_ids.to_numpy()
+    positions = np.flatnonzero(ids == product_id)
+    if positions.size == 0:
         return []
 
     # Profile defaults
     weights = (profile or {}).get("weights", {}) if isinstance(profile, dict) else {}
     price_tolerance = float((profile or {}).get("price_tolerance", 0.2))
 
-    # Compute sustainability score
-    try:
-        df["sustainability_score"] = df.apply(
-            lambda row: calculate_product_score(row, weights), axis=1
-        )
-    except Exception:
-        df["sustainability_score"] = 0.0
+    def _scores(frame):
+        try:
+            return score_products(frame, weights)
+        except Exception:
+            return np.zeros(len(frame), dtype=np.float32)
 
     # Target item row
-    df_cart_item = df.loc[df["product_id"] == product_id].iloc[0]
+    item_pos = int(positions[0])
+    df_cart_item = df.iloc[item_pos]
     item_name = df_cart_item.get("title", "")
     item_category = df_cart_item.get("category_name", df_cart_item.get("category", ""))
     item_price = float(df_cart_item.get("price", 0) or 0)
-    try:
-        item_score = float(df_cart_item.get("sustainability_score", 0) or 0)
-    except Exception:
-        item_score = 0.0
-
-    # Better alternatives
-    better_alts = df[
-        (df["sustainability_score"] >= item_score) &
-        (df["product_id"] != product_id)
-    ].copy()
-
-    # Price range widening
-    def _within_price_range(frame, center, tol):
-        lo, hi = center * (1 - tol), center * (1 + tol)
-        return frame[(frame["price"] >= lo) & (frame["price"] <= hi)]
+    item_score = float(_scores(df.iloc[[item_pos]])[0])
 
+    # Price range widening over the sorted price index: score only the widest
+    # window once, then each tolerance step is two binary searches.
+    tolerances = []
     tol = price_tolerance
     while tol <= 0.5:
-        filtered = _within_price_range(better_alts, item_price, tol)
-        if len(filtered) >= top_k:
-            better_alts = filtered
-            break
+        tolerances.append(tol)
         tol += 0.05
+
+    # Precomputed neighbour table: re-rank only the item's top-M similar products
+    neighbor = neighbors.lookup(item_pos) if live else None
+    title_sim = None
+
+    selected = None
+    if neighbor is not None:
+        rows, sims = neighbor
+        row_scores = _scores(df.iloc[rows])
+        better = (row_scores >= item_score) & (ids[rows] != product_id)
+        rows, sims, row_scores = rows[better], sims[better], row_scores[better]
+        prices = pd.to_numeric(df["price"].iloc[rows], errors="coerce").to_numpy(dtype=np.float64)
+        for tol in tolerances:
+            in_window = (prices >= item_price * (1 - tol)) & (prices <= item_price * (1 + tol))
+            if in_window.sum() >= top_k:
+                rows, sims, row_scores = rows[in_window], sims[in_window], row_scores[in_window]
+                break
+        selected = (rows, row_scores)
+        title_sim = dict(zip(rows.tolist(), sims.tolist()))
+    elif tolerances:
+        if live and snapshot.price_index is not None:
+            index = snapshot.price_index
+        else:
+            index = workable_data.build_price_index(df)
+        widest = tolerances[-1]
+        prices, window = workable_data.price_window(index, item_price * (1 - widest), item_price * (1 + widest))
+        window_scores = _scores(df.iloc[window])
+        better = (window_scores >= item_score) & (ids[window] != product_id)
+        prices, rows, row_scores = prices[better], window[better], window_scores[better]
+        for tol in tolerances:
+            start = np.searchsorted(prices, item_price * (1 - tol), side="left")
+            end = np.searchsorted(prices, item_price * (1 + tol), side="right")
+            if end - start >= top_k:
+                selected = (rows[start:end], row_scores[start:end])
+                break
+
+    if selected is None:
+        # No window reached top_k: fall back to every better alternative
+        all_scores = _scores(df)
+        better = (all_scores >= item_score) & (ids != product_id)
+        selected = (np.flatnonzero(better), all_scores[better])
+
+    rows, row_scores = selected
+    order = np.argsort(rows, kind="stable")   # back to catalog order
+    rows, row_scores = rows[order], row_scores[order]
+    better_alts = df.iloc[rows].copy()
+    better_alts["sustainability_score"] = row_scores
     if better_alts.empty:
         return []
 
-    # Name similarity
-    try:
-        vec = TfidfVectorizer()
-        vec.fit(df["title"].fillna("").astype(str).tolist())
-        item_vec = vec.transform([str(item_name)])
-        alt_vecs = vec.transform(better_alts["title"].fillna("").astype(str).tolist())
-        better_alts["name_similarity"] = cosine_similarity(alt_vecs, item_vec).flatten()
-    except Exception:
-        better_alts["name_similarity"] = 0.0
+    # Name similarity from the precomputed title TF-IDF rows (L2-normalised,
+    # so the dot product is the cosine similarity); no per-request refit.
+    with metrics.stage("cart.name_similarity"):
+        try:
+            if title_sim is not None:
+                # Neighbour table already stores the title similarity
+                better_alts["name_similarity"] = [title_sim[row] for row in rows.tolist()]
+            else:
+                if live:
+                    item_vec = snapshot.product_vectors[item_pos]
+                    alt_vecs = snapshot.product_vectors[rows]
+                else:
+                    item_vec = snapshot.product_vectorizer.transform([str(item_name)])
+                    alt_vecs = snapshot.product_vectorizer.transform(better_alts["title"].fillna("").astype(str).tolist())
+                better_alts["name_similarity"] = (alt_vecs @ item_vec.T).toarray().ravel()
+        except Exception:
+            better_alts["name_similarity"] = 0.0
 
     # Category similarity
     cat_col = "category_name" if "category_name" in better_alts.columns else ("category" if "category" in better_alts.columns else None)
     if cat_col:
-        better_alts["category_score"] = better_alts[cat_col].apply(
+        better_alts["category_score"] = better_alts[cat_col].astype(object).apply(
             lambda c: 1.0 if c == item_category
             else 0.5 if str(item_category) in str(c) or str(c) in str(item_category)
             else 0.0
@@ -320,8 +371,7 @@ def cart_alternatives(profile, product_id, df, top_k=10):
     )
 
     # Top-K
-    better_alts = better_alts.sort_values("final_score", ascending=False).head(top_k)
-    better_alts["original_item"] = item_name
+    top = top_k_indices(better_alts["final_score"].to_numpy(), max_results or top_k)
 
     id_col = "_id" if "_id" in better_alts.columns else ("product_id" if "product_id" in better_alts.columns else None)
     if not id_col:
@@ -333,7 +383,6 @@ def cart_alternatives(profile, product_id, df, top_k=10):
 
 #     return [{k: _to_jsonable(v) for k, v in rec.items()} for rec in out.to_dict(orient="records")]
 
-    # Return only the ID column as a JSON-safe list
-    ids = better_alts[id_col].tolist()
-    return [_to_jsonable(v) for v in ids]
+    # Return only the ID column as a JSON-safe list (better_alts holds catalog rows `rows`)
+    return catalog_ids(df, id_col)[rows[top]].tolist()
 # # ...existing code...
\ No newline at end of file
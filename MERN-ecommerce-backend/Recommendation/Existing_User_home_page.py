@@ -1,56 +1,109 @@
+import hashlib
+import json
+import os
+import numpy as np
 import pandas as pd
-from .common_code import calculate_product_score, vectorizer, tag_vectors, get_user_avg_price
+import scipy.sparse as sp
+from .common_code import score_products, vectorizer, tag_vectors, get_user_avg_price
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from .common_code import remove_similar_items
-from .workable_data import workable_dataset
+from . import workable_data
 from .New_User_Home_page import new_user_home_page_recommendations
+from .ranking import top_k_indices
+from .cache import TTLCache
+from . import metrics
 
-def from_search_history(df, search_history, weights):
-    scored_products = pd.DataFrame()
-    for query in search_history:
-        query_vec = vectorizer.transform([query])
-        sim_scores = cosine_similarity(query_vec, tag_vectors).flatten()
-        df_copy = df.copy()
-        df_copy["similarity"] = sim_scores
-        df_copy = df_copy[df_copy["similarity"] > 0]
+# --------------------------
+# Search-history window
+# --------------------------
+SEARCH_HISTORY_WINDOW = 20   # most recent distinct queries that count
+RECENCY_DECAY = 0.85         # weight of each query relative to the one after it
 
-        df_copy["sustainability_score"] = df_copy.apply(
-            lambda row: calculate_product_score(row, weights), axis=1
-        )
+def recent_searches(search_history, window=SEARCH_HISTORY_WINDOW, decay=RECENCY_DECAY):
+    """(queries, weights) for the last `window` distinct queries, newest first.
+
+    search_history is oldest-first; a repeated query counts at its latest position.
+    The newest query weighs 1, the one before it `decay`, then decay**2, ...
+    """
+    queries = []
+    for query in reversed(search_history or []):
+        if isinstance(query, str) and query.strip() and query not in queries:
+            queries.append(query)
+            if len(queries) == window:
+                break
+    return queries, decay ** np.arange(len(queries))
+
+def from_search_history(df, search_history, weights, similarities=None):
+    """One row per product matching the recent searches, scored by its best query.
 
+    All windowed queries go through one vectorizer.transform and one sparse
+    product with tag_vectors; a product's similarity is its max over queries
+    of recency weight x cosine similarity. `similarities` may hold that
+    (queries x N) product precomputed, aligned with recent_searches().
+    """
+    queries, recency = recent_searches(search_history)
+    if not queries:
+        return pd.DataFrame()
+    catalog = workable_data.catalog()
+    if similarities is None:
+        with metrics.stage("home.vectorize"):
+            query_vecs = catalog.vectorizer.transform(queries)
+    with metrics.stage("home.similarity"):
+        if similarities is None:
+            similarities = query_vecs @ catalog.tag_vectors.T
+        best = (sp.diags(recency) @ similarities).max(axis=0).toarray().ravel()
+        rows = np.flatnonzero(best > 0)
+
+    with metrics.stage("home.score"):
+        df_copy = df.iloc[rows].copy()
+        df_copy["similarity"] = best[rows]
+        df_copy["sustainability_score"] = score_products(df_copy, weights)
         df_copy["final_score"] = (
             0.6 * df_copy["similarity"] + 0.4 * (df_copy["sustainability_score"] / 5)
         )
-        scored_products = pd.concat([scored_products, df_copy], ignore_index=True)
-    return scored_products
+    return df_copy
 
  # --- 2. Recommendations from Purchase History ---
+@metrics.timed("home.purchase_history")
 def from_purchase_history(df, purchased_categories, avg_purchase_price, weights, price_tolerance=0.2):
-    df_copy = df.copy()
-    df_copy["similarity"] = 0  # No query similarity, but we’ll use sustainability
-
-    # Filter by similar categories (avoid recommending exact same item)
-    if purchased_categories:
-        df_copy = df_copy[df_copy["category_name"].isin(purchased_categories)]
-
-    # Filter by price range
-    if avg_purchase_price:
+    catalog = workable_data.catalog()
+    if avg_purchase_price and df is catalog.workable_dataset and catalog.price_index is not None:
+        # Category + price filter via binary searches in the per-category price index
         min_price = avg_purchase_price * (1 - price_tolerance)
         max_price = avg_purchase_price * (1 + price_tolerance)
-        df_copy = df_copy[(df_copy["price"] >= min_price) & (df_copy["price"] <= max_price)]
+        categories = purchased_categories or [None]
+        rows = np.concatenate([
+            workable_data.price_window(catalog.price_index, min_price, max_price, category)[1]
+            for category in categories
+        ])
+        df_copy = df.iloc[np.sort(rows)].copy()
+        df_copy["similarity"] = 0
+    else:
+        df_copy = df.copy()
+        df_copy["similarity"] = 0  # No query similarity, but we’ll use sustainability
+
+        # Filter by similar categories (avoid recommending exact same item)
+        if purchased_categories:
+            df_copy = df_copy[df_copy["category_name"].isin(purchased_categories)]
+
+        # Filter by price range
+        if avg_purchase_price:
+            min_price = avg_purchase_price * (1 - price_tolerance)
+            max_price = avg_purchase_price * (1 + price_tolerance)
+            df_copy = df_copy[(df_copy["price"] >= min_price) & (df_copy["price"] <= max_price)]
 
     # Calculate sustainability score and final score
-    df_copy["sustainability_score"] = df_copy.apply(
-        lambda row: calculate_product_score(row, weights), axis=1
-    )
+    df_copy["sustainability_score"] = score_products(df_copy, weights)
     df_copy["final_score"] = (df_copy["sustainability_score"] / 5)
 
     return df_copy
 
-def home_page_recommendations(user_profile,df):
+@metrics.timed("home.total")
+def home_page_recommendations(user_profile,df,top_k=None,search_similarities=None):
     """
     Recommends products for an existing user using both search and purchase history.
+    Returns the best `top_k` ids (all of them when top_k is None), best first.
+    `search_similarities` is passed through to from_search_history.
     """
     purchase_history = user_profile.get("purchase_history", []) or []
     search_history = user_profile.get("search_history", []) or []
@@ -68,17 +121,18 @@ def home_page_recommendations(user_profile,df):
     # --- 3. Combine Both Recommendation Sources ---
     search_recs, purchase_recs = pd.DataFrame(), pd.DataFrame()
     if search_history:
-        search_recs = from_search_history(df, search_history,weights)
+        search_recs = from_search_history(df, search_history,weights,search_similarities)
     if purchase_history:
         purchase_recs = from_purchase_history(df, purchased_categories, avg_purchase_price, weights, price_tolerance)
 
     combined = pd.concat([search_recs, purchase_recs], ignore_index=True)
     if combined.empty:
-        return new_user_home_page_recommendations(user_profile)
+        return new_user_home_page_recommendations(user_profile, top_k)
   # Return empty Series if no recommendations
     # Remove already purchased products
-    combined = combined[~combined["product_id"].isin(purchase_history)]
-    combined = remove_similar_items(combined, purchased_names)
+    with metrics.stage("home.filter"):
+        combined = combined[~combined["product_id"].isin(purchase_history)]
+        combined = remove_similar_items(combined, purchased_names)
 
     # Remove duplicates by item_number, keep max final_score
     # Build aggregation dict dynamically and include _id if available
@@ -93,14 +147,59 @@ def home_page_recommendations(user_profile,df):
     }
     if "_id" in combined.columns:
         agg_dict["_id"] = "first"
-    combined = combined.groupby("product_id").agg(agg_dict).reset_index()
+    with metrics.stage("home.groupby"):
+        combined = combined.groupby("product_id").agg(agg_dict).reset_index()
 
-    # Sort and return ids (prefer Mongo _id, fallback to product_id)
-    combined = combined.sort_values("final_score", ascending=False)
+    # Select top-k and return ids (prefer Mongo _id, fallback to product_id)
+    with metrics.stage("home.rank"):
+        combined = combined.iloc[top_k_indices(combined["final_score"].to_numpy(), top_k)]
     if "_id" in combined.columns:
         return combined["_id"]
     return combined["product_id"]
 
-def user_home_page_recommendations(user_profile,workable_dataset):
-    recommendations = home_page_recommendations(user_profile,workable_dataset)
-    return recommendations
\ No newline at end of file
+# --------------------------
+# Per-user result cache
+# --------------------------
+HOME_CACHE_SIZE = int(os.getenv("HOME_CACHE_SIZE", "10000"))
+HOME_CACHE_TTL = float(os.getenv("HOME_CACHE_TTL", "300"))
+# Ids kept per entry; deeper requests (and top_k=None on a larger catalog) rank uncached
+HOME_CACHE_DEPTH = int(os.getenv("HOME_CACHE_DEPTH", "500"))
+# Profile fields that change the ranking
+RANKING_FIELDS = ("search_history", "purchase_history", "weights", "price_tolerance")
+
+# (user id, profile fingerprint, catalog version) -> best HOME_CACHE_DEPTH ids
+home_cache = TTLCache(maxsize=HOME_CACHE_SIZE, ttl=HOME_CACHE_TTL)
+_cached_version = {"catalog": None}
+
+def profile_fingerprint(user_profile):
+    """Hash of the profile fields that affect ranking"""
+    fields = {field: user_profile.get(field) for field in RANKING_FIELDS}
+    payload = json.dumps(fields, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def user_home_page_recommendations(user_profile,workable_dataset,top_k=None):
+    """home_page_recommendations, cached per user until their profile or the catalog changes.
+
+    Each entry holds the best HOME_CACHE_DEPTH ids; smaller top_k are
+    prefixes of it, since the ranking order does not depend on top_k.
+    """
+    user_id = user_profile.get("_id")
+    catalog = workable_data.catalog()
+    if user_id is None or workable_dataset is not catalog.workable_dataset:
+        return home_page_recommendations(user_profile,workable_dataset,top_k)
+
+    version = catalog.version
+    if _cached_version["catalog"] != version:
+        # Every entry was ranked against an older catalog
+        home_cache.clear()
+        _cached_version["catalog"] = version
+    key = (str(user_id), profile_fingerprint(user_profile), version)
+    deep = top_k is None or top_k > HOME_CACHE_DEPTH
+    ranked = home_cache.get(key)
+    if ranked is None and not deep:
+        ranked = home_page_recommendations(user_profile,workable_dataset,HOME_CACHE_DEPTH)
+        home_cache.set(key, ranked)
+    if ranked is None or (deep and len(ranked) >= HOME_CACHE_DEPTH):
+        # Deeper than the cache keeps; a shorter entry is the whole ranking
+        return home_page_recommendations(user_profile,workable_dataset,top_k)
+    return ranked if top_k is None else ranked.iloc[:top_k]
\ No newline at end of file
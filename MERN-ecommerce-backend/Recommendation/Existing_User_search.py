@@ -60,7 +60,7 @@ from .workable_data import workable_dataset, product_vectorizer, product_vectors
 # import pandas as pd
 # from .common_code import calculate_product_score  # ensure relative import
 
-# def search_based_recommendation(profile, query, df):
+# def search_based_recommendation(profile, query, df, top_k=20):
 #     q = (query or "").strip()
 #     if not q:
 #         return []
@@ -117,8 +117,12 @@ from .workable_data import workable_dataset, product_vectorizer, product_vectors
 
 # ...existing code...
 import pandas as pd
-from .common_code import calculate_product_score  # relative import
-from sklearn.metrics.pairwise import cosine_similarity
+import numpy as np
+from .common_code import score_products  # relative import
+from .ranking import top_k_indices
+from . import workable_data
+from . import metrics
+from .responses import catalog_ids
 from bson import ObjectId, Binary
 from datetime import datetime
 import base64
@@ -137,42 +141,51 @@ def _to_jsonable(v):
     return v
 
 
-def search_based_recommendation(profile, query, df):
+@metrics.timed("search.total")
+def search_based_recommendation(profile, query, df, top_k=20):
     q = (query or "").strip()
     if not q:
         return []
 
     if not isinstance(df, pd.DataFrame) or df.empty:
         return []
+    # Vectorizers and indexes all come from one snapshot
+    catalog = workable_data.catalog()
 
     # --- Step 1: Vectorize query ---
     try:
-        query_vec = vectorizer.transform([q])
+        query_vec = catalog.vectorizer.transform([q])
     except Exception as e:
         return [{"error": f"vectorizer failed: {e}"}]
 
-    # --- Step 2: Compute cosine similarity ---
+    # --- Step 2: Sparse retrieval over the inverted indexes ---
+    # Only rows sharing a term with the query get a (non-zero) similarity;
+    # everything else is skipped before sustainability scoring.
     try:
-        # Step 1: Transform the query into vector
-        query_vec = vectorizer.transform([query])
-        # sim_scores = cosine_similarity(query_vec, tag_vectors).flatten()
-        
-        # Step 2: Transform the query using both vectorizers
-        product_vec = product_vectorizer.transform([query])
-        category_vec = category_vectorizer.transform([query])
-
-        # Step 3: Compute similarities separately
-        sim_product = cosine_similarity(product_vec, product_vectors).flatten()
-        sim_category = cosine_similarity(category_vec, category_vectors).flatten()
-
-        product_weight = 0.7
-        category_weight = 0.3
-        # Step 4: Weighted similarity
-        sim_scores = product_weight * sim_product + category_weight * sim_category
+        # Transform the query using both vectorizers
+        with metrics.stage("search.vectorize"):
+            product_vec = catalog.product_vectorizer.transform([query])
+            category_vec = catalog.category_vectorizer.transform([query])
+
+        # Walk the postings of the query terms only
+        with metrics.stage("search.similarity"):
+            product_rows, sim_product = workable_data.postings_similarity(product_vec, catalog.product_index)
+            category_rows, sim_category = workable_data.postings_similarity(category_vec, catalog.category_index)
+
+            product_weight = 0.7
+            category_weight = 0.3
+            # Weighted similarity over the union of matched rows
+            rows = np.union1d(product_rows, category_rows)
+            sim_scores = np.zeros(rows.size)
+            sim_scores[np.searchsorted(rows, product_rows)] += product_weight * sim_product
+            sim_scores[np.searchsorted(rows, category_rows)] += category_weight * sim_category
     except Exception as e:
         return [{"error": f"cosine similarity failed: {e}"}]
 
-    df_copy = df.copy()
+    if rows.size == 0:
+        return []
+
+    df_copy = df.iloc[rows].copy()
     df_copy["similarity"] = sim_scores
 
     # --- Step 3: Price tolerance filter ---
@@ -193,17 +206,16 @@ def search_based_recommendation(profile, query, df):
         return []
 
     # --- Step 4: Sustainability scoring ---
-    try:
-        df_copy["sustainability_score"] = df_copy.apply(
-            lambda row: calculate_product_score(row, weights), axis=1
+    with metrics.stage("search.score"):
+        try:
+            df_copy["sustainability_score"] = score_products(df_copy, weights)
+        except Exception:
+            df_copy["sustainability_score"] = 0
+
+        # --- Step 5: Final score (weighted similarity + sustainability) ---
+        df_copy["final_score"] = (
+            0.6 * df_copy["similarity"] + 0.4 * (df_copy["sustainability_score"] / 5)
         )
-    except Exception:
-        df_copy["sustainability_score"] = 0
-
-    # --- Step 5: Final score (weighted similarity + sustainability) ---
-    df_copy["final_score"] = (
-        0.6 * df_copy["similarity"] + 0.4 * (df_copy["sustainability_score"] / 5)
-    )
 
     # --- Step 6: Remove already purchased or near-duplicates ---
     # if purchase_history:
@@ -251,5 +263,7 @@ def search_based_recommendation(profile, query, df):
     # # --- Step 8: Make JSON-serializable ---
     # return [{k: _to_jsonable(v) for k, v in rec.items()} for rec in out.to_dict(orient="records")]
 
-    out_ids = df_copy[id_col].head(20).tolist()
-    return [_to_jsonable(v) for v in out_ids]
+    with metrics.stage("search.rank"):
+        top = top_k_indices(df_copy["final_score"].to_numpy(), top_k)
+        # df_copy holds catalog rows `rows`; ids come pre-stringified
+        return catalog_ids(df, id_col)[rows[top]].tolist()
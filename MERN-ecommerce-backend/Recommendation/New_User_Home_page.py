@@ -1,16 +1,16 @@
-from .common_code import calculate_product_score, user_profile
+from .common_code import score_products, user_profile
 import pandas as pd
-from .workable_data import workable_dataset
+from . import workable_data
+from .ranking import top_k_indices
 
-def home_page(df,weights):
-    df_products = df.copy()
-    df_products["score"] = df_products.apply(calculate_product_score, axis=1,weights=weights)
-    new_user_recommended = df_products.sort_values("score", ascending=False)
+def home_page(df,weights,top_k=None):
+    scores = score_products(df, weights)
+    new_user_recommended = df.iloc[top_k_indices(scores, top_k)]
     return new_user_recommended["_id"]
 
 
 
-def new_user_home_page_recommendations(user_profile):
+def new_user_home_page_recommendations(user_profile, top_k=None):
     weights = user_profile["weights"]
-    recommendations = home_page(workable_dataset, weights)
+    recommendations = home_page(workable_data.catalog().workable_dataset, weights, top_k)
     return recommendations
@@ -1,4 +1,4 @@
-from common_code import calculate_product_score, form_vectorizer_tag_vectors
+from common_code import score_products, form_vectorizer_tag_vectors
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
@@ -43,9 +43,7 @@ def recommend_alternatives_from_cart(item_id, df, weights, price_tolerance=0.2,
     candidates = candidates[(candidates["price"] >= lower) & (candidates["price"] <= upper)]
 
     # 5. Compute sustainability score
-    candidates["sustainability_score"] = candidates.apply(
-        lambda row: calculate_product_score(row, weights), axis=1
-    )
+    candidates["sustainability_score"] = score_products(candidates, weights)
 
     # 6. Compute final score
     candidates["final_score"] = (
@@ -1,4 +1,4 @@
-from common_code import calculate_product_score, form_vectorizer_tag_vectors
+from common_code import score_products, form_vectorizer_tag_vectors
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
@@ -31,9 +31,7 @@ def recommend_for_search_query(query, df, weights):
     top_similar = df[df["similarity"] > 0].copy()
 
     # Step 4: Calculate sustainability-aware product score
-    top_similar["sustainability_score"] = top_similar.apply(
-        lambda row: calculate_product_score(row, weights), axis=1
-    )
+    top_similar["sustainability_score"] = score_products(top_similar, weights)
 
     # Step 5: Final combined score (weighted average of both)
     # You can change the weight for similarity vs sustainability here
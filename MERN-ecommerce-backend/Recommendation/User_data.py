@@ -1,24 +1,31 @@
-from pymongo import MongoClient
 from dotenv import load_dotenv
 from bson import ObjectId, Binary
-from flask import Flask, request, jsonify, Blueprint
+from flask import Flask, request, jsonify, Blueprint, g
 from datetime import datetime
 import base64
-import traceback
 import os
-import time
-
-app = Flask(__name__)
+from .cache import TTLCache
+from . import metrics
+from . import mongo
 
 load_dotenv()
 
-profile = {}
 
-mongo_uri = os.getenv("MONGO_URI") or os.getenv("Mongo_URI")
-client = MongoClient(mongo_uri)
-db2 = client["test"]
+mongo_uri = mongo.mongo_uri
+client = mongo.get_client()
+db2 = mongo.get_database()
 collection = db2["users"]
 
+# Only what ranking and motivation read; never the password, salt or addresses.
+# The Node app stores searches as searchHistory, the recommenders read search_history.
+USER_PROJECTION = {
+    "searchHistory": 1, "search_history": 1, "purchase_history": 1,
+    "weights": 1, "price_tolerance": 1,
+    "eco_score": 1, "water_score": 1, "carbon_saved": 1, "water_saved": 1,
+}
+# /api/user/me: the whole account document minus its secrets
+ACCOUNT_PROJECTION = {"password": 0, "salt": 0, "resetPasswordToken": 0}
+
 # def get_user_data(user_id):
 #     try:
 #         user = collection.find_one({"_id": ObjectId(user_id)})
@@ -31,31 +38,60 @@ collection = db2["users"]
 #     user["_id"] = str(user["_id"])  # Convert ObjectId to string for JSON
 #     return user
 
-user_cache = {}
-user_cache_time = {}
-
+# --------------------------
+# User cache
+# --------------------------
 CACHE_TTL = 30  # seconds
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_JITTER = 0.2  # expiry spread, as a fraction of CACHE_TTL
 
-def get_user_data(user_id):
-    now = time.time()
-    # Check if user is cached and not expired
-    if user_id in user_cache and now - user_cache_time[user_id] < CACHE_TTL:
-        return user_cache[user_id]
-    # Otherwise, fetch from DB
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=CACHE_TTL, jitter=USER_CACHE_JITTER)
+
+def _find_user(user_id, projection):
     try:
-        user = collection.find_one({"_id": ObjectId(user_id)})
+        user = collection.find_one({"_id": ObjectId(user_id)}, projection)
     except Exception as e:
         print("Invalid user_id:", e)
         return None
     if user is None:
         print("User not found!")
-        return None
+    return user
+
+@metrics.timed("user.fetch")
+def fetch_user(user_id):
+    """Load one user from Mongo; None if the id is invalid or unknown"""
+    user = _find_user(user_id, USER_PROJECTION)
+    return None if user is None else normalize_user(user)
+
+def fetch_account(user_id):
+    """The user's account fields (ACCOUNT_PROJECTION), uncached; None if the id is invalid or unknown"""
+    user = _find_user(user_id, ACCOUNT_PROJECTION)
+    if user is not None:
+        user["_id"] = str(user["_id"])
+    return user
+
+def normalize_user(user):
+    """A projected user document as the recommenders expect it (str _id, search_history)"""
     user["_id"] = str(user["_id"])
-    # Cache the result
-    user_cache[user_id] = user
-    user_cache_time[user_id] = now
+    searches = user.pop("searchHistory", None)
+    if "search_history" not in user:
+        user["search_history"] = searches or []
     return user
 
+def get_user_data(user_id):
+    # Concurrent misses for the same user share a single find_one
+    return user_cache.get_or_load(user_id, lambda: fetch_user(user_id))
+
+# WSGI environ key under which the asyncio front end (async_serving.py) hands
+# over the X-User-Id caller it already loaded, so the request never blocks on Mongo
+PREFETCHED_USER = "recommender.user"
+
+def request_user(user_id):
+    """The X-User-Id caller of the running request: prefetched if available, else get_user_data"""
+    if PREFETCHED_USER in request.environ:
+        return request.environ[PREFETCHED_USER]
+    return get_user_data(user_id)
+
 def _to_jsonable(value):
     """Recursively convert Mongo/BSON types to JSON-serializable values."""
     if isinstance(value, dict):
@@ -74,6 +110,25 @@ def _to_jsonable(value):
         except Exception:
             return base64.b64encode(value).decode("ascii")
     return value
+def current_profile():
+    """(profile, None) for this request's X-User-Id caller, or (None, error response).
+
+    The profile lives on flask.g, so it belongs to the current request only;
+    concurrent requests never see each other's user.
+    """
+    if "profile" in g:
+        return g.profile, None
+    # Example: get user_id from request header (adjust as needed for your auth)
+    user_id = request.headers.get("X-User-Id")
+    if not user_id:
+        return None, (jsonify({"error": "No user_id provided"}), 400)
+    with metrics.stage("user.lookup"):
+        user = request_user(user_id)
+    if not user:
+        return None, (jsonify({"error": "User not found"}), 404)
+    g.profile = _to_jsonable(user)
+    return g.profile, None
+
 bp=Blueprint("user", __name__)
 @bp.route('/api/user/me', methods=['GET'])
 def get_current_user():
@@ -89,17 +144,15 @@ def get_current_user():
     #     return jsonify({"error": "User not found"}), 404
     # return jsonify(user)
     try:
-        # Example: get user_id from request header (adjust as needed for your auth)
         user_id = request.headers.get("X-User-Id")
         if not user_id:
             return jsonify({"error": "No user_id provided"}), 400
-        user = get_user_data(user_id)
+        # Account fields, not the ranking profile current_profile() caches
+        with metrics.stage("user.fetch"):
+            user = fetch_account(user_id)
         if not user:
             return jsonify({"error": "User not found"}), 404
-        # update module-level profile with sanitized data and return
-        global profile
-        profile = _to_jsonable(user)
-        return jsonify(profile)
+        return jsonify(_to_jsonable(user))
     except Exception as e:
         # Surface details in development to diagnose 500s
         return jsonify({"error": "internal", "message": str(e)}), 500
@@ -110,7 +163,14 @@ def user_ping():
 
 @bp.route('/api/user/profile-debug', methods=['GET'])
 def profile_debug():
-    return jsonify(_to_jsonable(profile))
+    profile, error = current_profile()
+    if error:
+        return error
+    return jsonify(profile)
+
+@bp.route('/api/user/cache-stats', methods=['GET'])
+def user_cache_stats():
+    return jsonify(user_cache.stats())
 
 @bp.route('/api/user/sample-id', methods=['GET'])
 def sample_user_id():
@@ -124,6 +184,8 @@ def sample_user_id():
 # Example usage (for testing, not for production)
 if __name__ == "__main__":
     # Register the blueprint first
+    app = Flask(__name__)
+    app.register_blueprint(bp)
 
     # Print all routes
     print(app.url_map)
@@ -0,0 +1,41 @@
+import hmac
+import os
+from flask import Blueprint, jsonify, request
+from . import workable_data
+
+# --------------------------
+# Settings
+# --------------------------
+# Shared secret for the admin endpoints; they answer 403 while it is unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+bp = Blueprint("admin", __name__)
+
+@bp.before_request
+def require_admin_token():
+    supplied = request.headers.get("X-Admin-Token", "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(supplied.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        return jsonify({"error": "forbidden"}), 403
+
+def _status():
+    catalog = workable_data.current
+    return {
+        **workable_data.rebuild_status,
+        "current_version": catalog.version if catalog else None,
+        "current_rows": len(catalog.workable_dataset) if catalog else 0,
+    }
+
+@bp.route("/api/admin/catalog/rebuild", methods=["POST"])
+def rebuild_catalog():
+    source = (request.get_json(silent=True) or {}).get("source", "db")
+    try:
+        started = workable_data.start_rebuild(source)
+    except ValueError as e:
+        return jsonify({"error": "bad_request", "message": str(e)}), 400
+    if not started:
+        return jsonify({"error": "conflict", "message": "a rebuild is already running", **_status()}), 409
+    return jsonify(_status()), 202
+
+@bp.route("/api/admin/catalog/status", methods=["GET"])
+def catalog_status():
+    return jsonify(_status())
@@ -1,54 +1,112 @@
 from flask import Blueprint, jsonify, request
 from . import User_data as user_data
-from .workable_data import workable_dataset
-from .Existing_User_home_page import user_home_page_recommendations
+from . import workable_data
+from .Existing_User_home_page import user_home_page_recommendations, home_cache, profile_fingerprint
 from .Existing_User_search import search_based_recommendation
 from .Existing_User_cart import cart_alternatives
+from .ranking import parse_page_args, ranked_page, snapshots
+from .batch import parse_batch, batch_search, batch_cart, batch_home
+from .responses import etag_for, conditional_response, bodies
 
 bp = Blueprint("recommendations", __name__)
-@bp.route("/api/user/profile-debug", methods=["GET"])
-def profile_debug():
-    # Returns the in-memory profile dict to verify it’s set
-    return jsonify(user_data.profile)
+@bp.route("/api/recommendations/cache-stats", methods=["GET"])
+def cache_stats():
+    return jsonify({
+        "users": user_data.user_cache.stats(),
+        "home": home_cache.stats(),
+        "snapshots": snapshots.stats(),
+        "responses": bodies.stats(),
+        "catalog_version": workable_data.catalog().version,
+    })
+@bp.route("/api/recommendations/catalog-status", methods=["GET"])
+def catalog_status():
+    # Freshness of the served catalog and of the scheduled change checks
+    catalog = workable_data.catalog()
+    return jsonify({
+        "catalog_version": catalog.version,
+        "catalog_fingerprint": catalog.fingerprint,
+        "products": len(catalog.workable_dataset),
+        "published_at": catalog.published_at,
+        "rebuild": workable_data.rebuild_status.get("state"),
+        **workable_data.refresh_status,
+    })
 @bp.route("/api/recommendations/home", methods=["GET"])
 def get_home_page_recommendations():
     try:
-        # Ensure profile is loaded; if header missing, this will 400 from get_current_user
-        resp = user_data.get_current_user()
-        status_code = getattr(resp, "status_code", None)
-        if status_code and status_code != 200:
-            return resp
+        # Profile of this request's caller; 400/404 if the header is missing or unknown
+        profile, error = user_data.current_profile()
+        if error:
+            return error
 
-        data = user_home_page_recommendations(user_data.profile, workable_dataset)
         try:
-            data = data.tolist()
-        except AttributeError:
-            pass
-        if isinstance(data, dict):
-            data = {k: (v.tolist() if hasattr(v, "tolist") else v) for k, v in data.items()}
-        return jsonify(data)
+            limit, cursor = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({"error": "bad_request", "message": str(e)}), 400
+        user_id = request.headers.get("X-User-Id")
+
+        def build():
+            if limit is not None:
+                key = ("home", user_id)
+                page = ranked_page(
+                    key,
+                    lambda k: user_home_page_recommendations(profile, workable_data.catalog().workable_dataset, top_k=k).tolist(),
+                    limit, cursor,
+                )
+                return page, 200
+
+            data = user_home_page_recommendations(profile, workable_data.catalog().workable_dataset)
+            try:
+                data = data.tolist()
+            except AttributeError:
+                pass
+            if isinstance(data, dict):
+                data = {k: (v.tolist() if hasattr(v, "tolist") else v) for k, v in data.items()}
+            return data, 200
+
+        # Same catalog content, ranking fields and arguments -> same body
+        etag = etag_for("home", user_id, profile_fingerprint(profile), limit, cursor)
+        return conditional_response(etag, build, "home")
     except Exception as e:
         return jsonify({"error": "internal", "message": str(e)}), 500
 
 @bp.route("/api/recommendations/search", methods=["GET"])
 def get_search_query_recommendations():
     try:
-        resp = user_data.get_current_user()
-        status_code = getattr(resp, "status_code", None)
-        if status_code and status_code != 200:
-            return resp
+        profile, error = user_data.current_profile()
+        if error:
+            return error
 
         query = request.args.get("soap", "")
         if not query:
             return jsonify({"error": "missing query"}), 400
 
-        # Call the search-based recommendation function
-        res = search_based_recommendation(user_data.profile, query, workable_dataset)
+        try:
+            limit, cursor = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({"error": "bad_request", "message": str(e)}), 400
+        user_id = request.headers.get("X-User-Id")
 
-        if not res:  # error throw if no results
-            return jsonify({"error": "no recommendations found for given query"}), 404
+        def build():
+            if limit is not None:
+                key = ("search", user_id, query)
+                page = ranked_page(
+                    key,
+                    lambda k: search_based_recommendation(profile, query, workable_data.catalog().workable_dataset, top_k=k),
+                    limit, cursor,
+                )
+                if not page["items"] and not cursor:
+                    return {"error": "no recommendations found for given query"}, 404
+                return page, 200
 
-        return jsonify(res), 200
+            # Call the search-based recommendation function
+            res = search_based_recommendation(profile, query, workable_data.catalog().workable_dataset)
+
+            if not res:  # error throw if no results
+                return {"error": "no recommendations found for given query"}, 404
+            return res, 200
+
+        etag = etag_for("search", user_id, profile_fingerprint(profile), query, limit, cursor)
+        return conditional_response(etag, build, "search")
     except Exception as e:
         return jsonify({"error": "internal", "message": str(e)}), 500
     
@@ -57,7 +115,7 @@ def get_search_query_recommendations():
 from bson import ObjectId
 
 def _sample_product_id():
-    df = workable_dataset
+    df = workable_data.catalog().workable_dataset
     if getattr(df, "empty", True):
         return None
     for col in ["product_id", "_id", "id"]:
@@ -79,9 +137,9 @@ def get_cart_recommendations_path(product_id):
 @bp.route("/api/recommendations/cart", methods=["GET", "POST"])
 def get_cart_recommendations():
     try:
-        resp = user_data.get_current_user()
-        if hasattr(resp, "status_code") and resp.status_code != 200:
-            return resp
+        profile, error = user_data.current_profile()
+        if error:
+            return error
 
         payload = request.get_json(silent=True) or {}
         # accept both query string and JSON body
@@ -89,8 +147,80 @@ def get_cart_recommendations():
         if not product_id:
             return jsonify({"error": "bad_request", "message": "product_id is required"}), 400
 
-        res = cart_alternatives(user_data.profile, product_id, workable_dataset, top_k=10)
-        return jsonify(res or []), 200
+        try:
+            limit, cursor = parse_page_args({**request.args, **payload})
+        except ValueError as e:
+            return jsonify({"error": "bad_request", "message": str(e)}), 400
+        user_id = request.headers.get("X-User-Id")
+
+        def build():
+            if limit is not None:
+                key = ("cart", user_id, str(product_id))
+                page = ranked_page(
+                    key,
+                    lambda k: cart_alternatives(profile, product_id, workable_data.catalog().workable_dataset, top_k=10, max_results=k) or [],
+                    limit, cursor,
+                )
+                return page, 200
+
+            res = cart_alternatives(profile, product_id, workable_data.catalog().workable_dataset, top_k=10)
+            return res or [], 200
+
+        etag = etag_for("cart", user_id, profile_fingerprint(profile), str(product_id), limit, cursor)
+        return conditional_response(etag, build, "cart")
+    except Exception as e:
+        return jsonify({"error": "internal", "message": str(e)}), 500
+# ...existing code...
+# --------------------------
+# Batch endpoints
+# --------------------------
+def _batch_profile():
+    """Profile of the optional X-User-Id caller (default weights without one), or an error response"""
+    user_id = request.headers.get("X-User-Id")
+    if not user_id:
+        return {}, None
+    user = user_data.request_user(user_id)
+    if not user:
+        return None, (jsonify({"error": "User not found"}), 404)
+    return user_data._to_jsonable(user), None
+
+@bp.route("/api/recommendations/batch/search", methods=["POST"])
+def batch_search_recommendations():
+    try:
+        try:
+            queries, limit = parse_batch(request.get_json(silent=True) or {}, "queries")
+        except ValueError as e:
+            return jsonify({"error": "bad_request", "message": str(e)}), 400
+        profile, error = _batch_profile()
+        if error:
+            return error
+        return jsonify({"results": batch_search(profile, queries, workable_data.catalog().workable_dataset, top_k=limit)})
+    except Exception as e:
+        return jsonify({"error": "internal", "message": str(e)}), 500
+
+@bp.route("/api/recommendations/batch/cart", methods=["POST"])
+def batch_cart_recommendations():
+    try:
+        payload = request.get_json(silent=True) or {}
+        try:
+            product_ids, limit = parse_batch(payload, "product_ids")
+        except ValueError as e:
+            return jsonify({"error": "bad_request", "message": str(e)}), 400
+        profile, error = _batch_profile()
+        if error:
+            return error
+        max_results = limit if "limit" in payload else None
+        return jsonify({"results": batch_cart(profile, product_ids, workable_data.catalog().workable_dataset, max_results=max_results)})
+    except Exception as e:
+        return jsonify({"error": "internal", "message": str(e)}), 500
+
+@bp.route("/api/recommendations/batch/home", methods=["POST"])
+def batch_home_recommendations():
+    try:
+        try:
+            user_ids, limit = parse_batch(request.get_json(silent=True) or {}, "user_ids")
+        except ValueError as e:
+            return jsonify({"error": "bad_request", "message": str(e)}), 400
+        return jsonify({"results": batch_home(user_ids, workable_data.catalog().workable_dataset, top_k=limit)})
     except Exception as e:
         return jsonify({"error": "internal", "message": str(e)}), 500
-# ...existing code...
\ No newline at end of file
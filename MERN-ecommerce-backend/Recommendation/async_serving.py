@@ -0,0 +1,230 @@
+"""Asyncio (ASGI) serving mode for the Flask app.
+
+    uvicorn app:asgi_app --workers 2
+
+uvicorn is in requirements.txt; the WSGI deployment does not need it, and
+this module imports nothing from it.
+
+The event loop does the waiting and a bounded thread pool does the CPU work:
+
+- The X-User-Id caller (and every user_ids entry of /batch/home) is loaded
+  with pymongo's AsyncMongoClient (same pool settings as mongo.get_client) on the loop, through the same user cache,
+  so a request waiting on Mongo holds no thread.
+- The Flask app then runs the request on an executor of ASYNC_WORKERS
+  threads, with the loaded user handed over in the WSGI environ. Routes,
+  ETags and response bodies are exactly those of the WSGI deployment.
+
+Hundreds of requests can be in flight per process; at most ASYNC_WORKERS of
+them rank at the same time, the rest queue for a thread.
+Request bodies are buffered up to MAX_CONTENT_LENGTH (or ASYNC_MAX_BODY_BYTES,
+1 MiB by default); anything larger gets a 413.
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from bson import ObjectId
+from . import metrics
+from . import mongo
+from . import User_data as user_data
+from .batch import MAX_BATCH_ITEMS
+
+# --------------------------
+# Settings
+# --------------------------
+ASYNC_WORKERS = int(os.getenv("ASYNC_WORKERS", str(os.cpu_count() or 4)))
+# Routes whose handlers read the X-User-Id caller
+USER_PREFIXES = ("/api/recommendations/", "/api/user/")
+BATCH_HOME_PATH = "/api/recommendations/batch/home"
+# Largest request body buffered before Flask sees it, unless the app sets MAX_CONTENT_LENGTH
+MAX_BODY_BYTES = int(os.getenv("ASYNC_MAX_BODY_BYTES", str(1 << 20)))
+
+
+class AsyncApp:
+    """ASGI 3 application serving a WSGI (Flask) app"""
+
+    def __init__(self, wsgi_app, workers=None):
+        self.wsgi_app = wsgi_app
+        self.workers = workers or ASYNC_WORKERS
+        self.max_body = getattr(wsgi_app, "config", {}).get("MAX_CONTENT_LENGTH") or MAX_BODY_BYTES
+        self.executor = None
+        self.client = None
+        self._loading = {}   # user_id -> Task, so concurrent misses share one find_one
+
+    # --------------------------
+    # Lifecycle
+    # --------------------------
+    def _start(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="recommender")
+        if self.client is None:
+            self.client = mongo.get_async_client()
+
+    async def _stop(self):
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+        if self.executor is not None:
+            # Let queued requests finish without blocking the loop while they do
+            executor, self.executor = self.executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self._start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self._stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # --------------------------
+    # Users
+    # --------------------------
+    @property
+    def users(self):
+        return self.client[user_data.db2.name][user_data.collection.name]
+
+    async def _fetch_user(self, user_id):
+        """Async twin of User_data.fetch_user"""
+        try:
+            with metrics.stage("user.fetch"):
+                user = await self.users.find_one({"_id": ObjectId(user_id)}, user_data.USER_PROJECTION)
+        except Exception as e:
+            print("Invalid user_id:", e)
+            return None
+        if user is None:
+            print("User not found!")
+            return None
+        user = user_data.normalize_user(user)
+        user_data.user_cache.set(user_id, user)
+        return user
+
+    async def load_user(self, user_id):
+        """User for user_id from the shared user cache, else Mongo; None if invalid or unknown"""
+        user = user_data.user_cache.get(user_id)
+        if user is not None:
+            return user
+        task = self._loading.get(user_id)
+        if task is None:
+            task = self._loading[user_id] = asyncio.ensure_future(self._fetch_user(user_id))
+            task.add_done_callback(lambda _: self._loading.pop(user_id, None))
+        # A waiter cancelled by its client's disconnect must not cancel the load the others share
+        return await asyncio.shield(task)
+
+    async def warm_users(self, user_ids):
+        """Load every uncached, valid id of user_ids into the user cache with one $in query"""
+        missing = {}
+        for user_id in user_ids[:MAX_BATCH_ITEMS]:
+            if isinstance(user_id, str) and ObjectId.is_valid(user_id) and user_data.user_cache.get(user_id) is None:
+                missing[ObjectId(user_id)] = user_id
+        if not missing:
+            return
+        with metrics.stage("user.fetch"):
+            async for user in self.users.find({"_id": {"$in": list(missing)}}, user_data.USER_PROJECTION):
+                user_id = missing[user["_id"]]
+                user_data.user_cache.set(user_id, user_data.normalize_user(user))
+
+    # --------------------------
+    # Requests
+    # --------------------------
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            raise RuntimeError(f"unsupported ASGI scope type {scope['type']!r}")
+        self._start()
+
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if len(body) > self.max_body:
+                return await self._too_large(send)
+            if not message.get("more_body"):
+                break
+
+        environ = self._environ(scope, bytes(body))
+        path = scope["path"]
+        user_id = environ.get("HTTP_X_USER_ID")
+        if user_id and path.startswith(USER_PREFIXES):
+            environ[user_data.PREFETCHED_USER] = await self.load_user(user_id)
+        if path == BATCH_HOME_PATH and scope["method"] == "POST":
+            try:
+                user_ids = json.loads(body or b"{}").get("user_ids")
+            except (ValueError, AttributeError):
+                user_ids = None   # the route itself answers 400
+            if isinstance(user_ids, list):
+                await self.warm_users(user_ids)
+
+        loop = asyncio.get_running_loop()
+        status, headers, chunks = await loop.run_in_executor(self.executor, self._run_wsgi, environ)
+        await send({
+            "type": "http.response.start",
+            "status": int(status.split(" ", 1)[0]),
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+        })
+        await send({"type": "http.response.body", "body": b"".join(chunks)})
+
+    async def _too_large(self, send):
+        body = json.dumps({"error": "payload_too_large", "message": f"request body over {self.max_body} bytes"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("latin-1"))],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def _environ(self, scope, body):
+        """WSGI environ (PEP 3333) for one ASGI http scope"""
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0],
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope["headers"]:
+            name = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if name == "CONTENT_TYPE":
+                environ["CONTENT_TYPE"] = value
+            elif name != "CONTENT_LENGTH":
+                key = f"HTTP_{name}"
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def _run_wsgi(self, environ):
+        """(status, headers, body chunks) of the WSGI app for one request; runs on the executor"""
+        response, chunks = {}, []
+
+        def start_response(status, headers, exc_info=None):
+            response["status"], response["headers"] = status, headers
+            return chunks.append
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            chunks.extend(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        return response["status"], response["headers"], chunks
@@ -0,0 +1,129 @@
+"""Batch recommendations: many queries, products or users in one call.
+
+Queries from the whole batch are vectorized together and scored against the
+catalog with one sparse matrix product per vectorizer; sustainability is
+scored once over the catalog, and each input's ranking is cut from its row.
+"""
+import os
+import numpy as np
+from . import User_data as user_data
+from . import workable_data
+from .common_code import score_products
+from .Existing_User_cart import cart_alternatives
+from .Existing_User_home_page import home_page_recommendations, recent_searches
+from .Existing_User_search import _to_jsonable
+from .ranking import DEFAULT_LIMIT, MAX_LIMIT, top_k_indices
+from .responses import catalog_ids
+
+# --------------------------
+# Settings
+# --------------------------
+MAX_BATCH_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+def parse_batch(payload, field):
+    """(items, limit) from a JSON body; raises ValueError on a bad request"""
+    items = payload.get(field)
+    if not isinstance(items, list) or not items:
+        raise ValueError(f"{field} must be a non-empty list")
+    if len(items) > MAX_BATCH_ITEMS:
+        raise ValueError(f"at most {MAX_BATCH_ITEMS} {field} per call")
+    try:
+        limit = int(payload.get("limit", DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    # Deduplicate, keeping the caller's order
+    items = list(dict.fromkeys(str(item) for item in items))
+    return items, max(1, min(limit, MAX_LIMIT))
+
+def similarity_matrix(texts, vectorizer, vectors):
+    """(len(texts) x N) CSR cosine similarities for a whole batch of texts.
+
+    Rows of `vectors` and the transformed texts are L2-normalized, so the
+    sparse product is the cosine similarity; column indices come back sorted.
+    """
+    sims = (vectorizer.transform(texts) @ vectors.T).tocsr()
+    sims.sort_indices()
+    return sims
+
+def _id_column(df):
+    return "_id" if "_id" in df.columns else ("product_id" if "product_id" in df.columns else None)
+
+# --------------------------
+# Search
+# --------------------------
+def batch_search(profile, queries, df, top_k=20):
+    """{query: [ids]}, ranked as search_based_recommendation ranks a single query"""
+    results = {query: [] for query in queries}
+    id_col = _id_column(df)
+    texts = [query for query in queries if query.strip()]
+    if not texts or id_col is None or df.empty:
+        return results
+
+    catalog = workable_data.catalog()
+    product_sims = similarity_matrix(texts, catalog.product_vectorizer, catalog.product_vectors)
+    category_sims = similarity_matrix(texts, catalog.category_vectorizer, catalog.category_vectors)
+    sims = (0.7 * product_sims + 0.3 * category_sims).tocsr()
+    sims.sort_indices()
+
+    weights = (profile or {}).get("weights", {}) if isinstance(profile, dict) else {}
+    try:
+        sustainability = np.asarray(score_products(df, weights))
+    except Exception:
+        sustainability = np.zeros(len(df))
+    ids = catalog_ids(df, id_col)
+
+    for i, query in enumerate(texts):
+        start, stop = sims.indptr[i], sims.indptr[i + 1]
+        rows, scores = sims.indices[start:stop], sims.data[start:stop]
+        matched = scores > 0
+        rows, scores = rows[matched], scores[matched]
+        final = 0.6 * scores + 0.4 * (sustainability[rows] / 5)
+        top = rows[top_k_indices(final, top_k)]
+        results[query] = ids[top].tolist()
+    return results
+
+# --------------------------
+# Cart
+# --------------------------
+def batch_cart(profile, product_ids, df, top_k=10, max_results=None):
+    """{product_id: [ids]} of cart alternatives for each product.
+
+    Each product's candidates are its own price/category window (or neighbour
+    list), so there is no shared product to batch; this saves the per-call
+    HTTP, Flask and user lookup overhead.
+    """
+    return {
+        product_id: cart_alternatives(profile, product_id, df, top_k=top_k, max_results=max_results) or []
+        for product_id in product_ids
+    }
+
+# --------------------------
+# Home page
+# --------------------------
+def batch_home(user_ids, df, top_k=20):
+    """{user_id: [ids]} of home page recommendations; {"error": ...} for unknown users.
+
+    The search histories of every user are scored against tag_vectors in one
+    sparse product and each user's slice is handed to home_page_recommendations.
+    """
+    results, profiles = {}, {}
+    for user_id in user_ids:
+        user = user_data.get_user_data(user_id)
+        if user:
+            profiles[user_id] = user_data._to_jsonable(user)
+        else:
+            results[user_id] = {"error": "User not found"}
+
+    histories = {user_id: recent_searches(profile.get("search_history"))[0] for user_id, profile in profiles.items()}
+    queries = [query for history in histories.values() for query in history]
+    catalog = workable_data.catalog()
+    sims = similarity_matrix(queries, catalog.vectorizer, catalog.tag_vectors) if queries else None
+
+    offset = 0
+    for user_id, profile in profiles.items():
+        count = len(histories[user_id])
+        user_sims = sims[offset:offset + count] if count else None
+        offset += count
+        recs = home_page_recommendations(profile, df, top_k, search_similarities=user_sims)
+        results[user_id] = [_to_jsonable(v) for v in recs.tolist()]
+    return {user_id: results[user_id] for user_id in user_ids}
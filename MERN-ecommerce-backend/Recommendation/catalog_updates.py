@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import pandas as pd
+import scipy.sparse as sp
+from . import workable_data
+from .common_code import SCORE_COLUMNS, grade_score_columns
+
+# --------------------------
+# Settings
+# --------------------------
+# Out-of-vocabulary terms seen in patched documents since the last full fit,
+# relative to the number of (row, term) entries in tag_vectors. Past this, refit.
+DRIFT_THRESHOLD = float(os.getenv("CATALOG_DRIFT_THRESHOLD", "0.05"))
+BATCH_SIZE = int(os.getenv("CATALOG_UPDATE_BATCH_SIZE", "500"))
+
+drift = {"unknown": 0}
+
+# --------------------------
+# Change feeds
+# --------------------------
+class MongoChangeFeed:
+    """Insert/update/replace/delete events from a change stream on `products`"""
+
+    def __init__(self, collection=None, resume_after=None, max_await_ms=1000):
+        self.collection = collection if collection is not None else workable_data.collection
+        self.resume_token = resume_after
+        self.max_await_ms = max_await_ms
+        self._stream = None
+
+    def poll(self, max_events=BATCH_SIZE):
+        """Return up to max_events pending events without blocking past max_await_ms"""
+        if self._stream is None:
+            self._stream = self.collection.watch(
+                full_document="updateLookup",
+                resume_after=self.resume_token,
+                max_await_time_ms=self.max_await_ms,
+            )
+        events = []
+        while len(events) < max_events:
+            event = self._stream.try_next()
+            if event is None:
+                break
+            events.append(event)
+        self.resume_token = self._stream.resume_token
+        return events
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+
+class ReplayChangeFeed:
+    """Replayable stand-in for a change stream, backed by a list or a JSONL file"""
+
+    def __init__(self, events=None, path=None):
+        self.events = list(events or [])
+        if path:
+            with open(path, encoding="utf-8") as f:
+                self.events.extend(json.loads(line) for line in f if line.strip())
+        self.position = 0
+
+    def append(self, event):
+        self.events.append(event)
+
+    def poll(self, max_events=BATCH_SIZE):
+        batch = self.events[self.position:self.position + max_events]
+        self.position += len(batch)
+        return batch
+
+    def rewind(self):
+        self.position = 0
+
+    def close(self):
+        pass
+
+# --------------------------
+# Patching
+# --------------------------
+def collapse_events(events):
+    """Reduce a batch to the final state per product: _id -> document, or None if deleted"""
+    latest = {}
+    for event in events:
+        op = event.get("operationType")
+        key = str((event.get("documentKey") or {}).get("_id"))
+        if op in ("insert", "update", "replace"):
+            doc = event.get("fullDocument")
+            if doc is not None:   # update whose post-image is gone was followed by a delete
+                latest[key] = doc
+        elif op == "delete":
+            latest[key] = None
+    return latest
+
+def prepare_rows(docs):
+    """Project and preprocess new/updated documents the same way refresh_cache does"""
+    df = workable_data.documents_to_frame(docs)
+    for col in ["Tags", "title", "category_name"]:
+        df[col] = df[col].fillna("")
+    return df
+
+def unknown_terms(tags, catalog):
+    """Number of out-of-vocabulary terms in `tags`, counted once per document"""
+    analyzer = catalog.vectorizer.build_analyzer()
+    vocabulary = catalog.vectorizer.vocabulary_
+    return sum(len({token for token in analyzer(text) if token not in vocabulary}) for text in tags)
+
+def patch_fingerprint(base, latest):
+    """Fingerprint of `base` with one collapsed batch applied, without rehashing the catalog.
+
+    Deterministic for the same base and batch, so workers applying the same
+    stream agree; a batch split differently only costs a cache miss.
+    """
+    payload = json.dumps([base, sorted(latest.items())], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def apply_changes(events):
+    """Publish a new catalog snapshot with one batch of change events applied.
+
+    Deleted and updated rows are dropped and upserted documents appended, with
+    new rows transformed by the frozen vectorizers. Only when vocabulary drift
+    passes DRIFT_THRESHOLD are the vectorizers refit on the whole catalog.
+    The patch is published only onto the catalog it was built from; if a
+    rebuild was published meanwhile, the batch is applied again on top of it.
+    """
+    latest = collapse_events(events)
+    if not latest:
+        return {"upserted": 0, "deleted": 0, "refit": False}
+    while True:
+        catalog = workable_data.current
+        snapshot, summary, unknown = patch_snapshot(catalog, latest)
+        if workable_data.publish(snapshot, base=catalog) is not None:
+            drift["unknown"] = 0 if summary["refit"] else drift["unknown"] + unknown
+            return summary
+
+def patch_snapshot(catalog, latest):
+    """(snapshot, summary, unknown terms) of `catalog` with the collapsed batch `latest` applied"""
+    summary = {"upserted": 0, "deleted": 0, "refit": False}
+    df = catalog.workable_dataset
+    keep = ~df["_id"].astype(str).isin(latest.keys()).to_numpy()
+    upserts = [doc for doc in latest.values() if doc is not None]
+    new_rows = prepare_rows(upserts) if upserts else df.head(0)
+    if upserts and all(col in df.columns for col in SCORE_COLUMNS):
+        grades = grade_score_columns(new_rows)
+        for col in SCORE_COLUMNS:
+            new_rows[col] = grades[col]
+
+    removed = df["_id"].astype(str)[~keep]
+    summary["upserted"] = len(new_rows)
+    summary["deleted"] = sum(1 for key in removed if latest[key] is None)
+
+    # New rows may carry categories the catalog hasn't seen; re-compact the union
+    patched = workable_data.compact_catalog(pd.concat([df[keep], new_rows], ignore_index=True))
+    unknown = unknown_terms(new_rows["Tags"], catalog) if upserts else 0
+    ratio = (drift["unknown"] + unknown) / max(catalog.tag_vectors.nnz, 1)
+
+    if ratio > DRIFT_THRESHOLD:
+        print(f"🔄 Vocabulary drift {ratio:.1%} > {DRIFT_THRESHOLD:.1%}, refitting vectorizers...")
+        summary["refit"] = True
+        return workable_data.build_snapshot(patched), summary, unknown
+
+    def _patch(matrix, vectorizer, column):
+        return sp.vstack([matrix[keep], vectorizer.transform(new_rows[column])], format="csr")
+
+    snapshot = workable_data.assemble_snapshot(patched, [
+        (catalog.vectorizer, _patch(catalog.tag_vectors, catalog.vectorizer, "Tags")),
+        (catalog.product_vectorizer, _patch(catalog.product_vectors, catalog.product_vectorizer, "title")),
+        (catalog.category_vectorizer, _patch(catalog.category_vectors, catalog.category_vectorizer, "category_name")),
+    ], fingerprint=patch_fingerprint(catalog.fingerprint, latest))
+    return snapshot, summary, unknown
+
+def consume(feed, stop=None, idle_sleep=1.0):
+    """Apply batches from `feed` until `stop` is set (a replay feed stops when drained)"""
+    while stop is None or not stop.is_set():
+        events = feed.poll(BATCH_SIZE)
+        if events:
+            summary = apply_changes(events)
+            print(f"✅ Catalog patched: {summary}")
+            continue
+        if isinstance(feed, ReplayChangeFeed):
+            break
+        if stop is not None:
+            stop.wait(idle_sleep)
+        else:
+            time.sleep(idle_sleep)
+
+def start_change_stream(feed=None):
+    """Run consume() on a daemon thread; returns (thread, stop_event)"""
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=consume, args=(feed or MongoChangeFeed(),), kwargs={"stop": stop},
+        name="catalog-change-stream", daemon=True,
+    )
+    thread.start()
+    return thread, stop
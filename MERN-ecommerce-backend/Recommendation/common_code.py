@@ -4,6 +4,7 @@ from .workable_data import workable_dataset
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from .workable_data import vectorizer, tag_vectors
+from . import workable_data
 
 user_profile = {
     "search_history": ["vegan soap", "eco toothpaste"],
@@ -51,6 +52,7 @@ def remove_similar_items(df, purchased_names, threshold=0.8):
     except Exception:
         return df
 
+    vectorizer = workable_data.catalog().vectorizer
     name_vecs = vectorizer.transform(df["title"])
     purchased_vecs = vectorizer.transform(purchased_names)
     sim_matrix = cosine_similarity(name_vecs, purchased_vecs)
@@ -64,6 +66,7 @@ def remove_similar_items(df, purchased_names, threshold=0.8):
     return df[max_sim < threshold]
 
 def calculate_product_score(row, weights):
+    # Row-wise reference implementation; recommenders use score_products instead
     # Provide sensible defaults and support both 'eco' and 'carbon' keys
     if not isinstance(weights, dict):
         weights = {"rating": 0.3, "carbon": 0.4, "water": 0.3}
@@ -74,13 +77,72 @@ def calculate_product_score(row, weights):
         float(weights.get("water", 0.3)) * float(water_grade_to_score.get(row.get("Water_Rating", "Unknown"), 0))
     )
 
+# --------------------------
+# Vectorized scoring engine
+# --------------------------
+# Numeric grade columns, precomputed once per catalog load so scoring is a
+# single (N x 3) @ (3,) float32 dot product instead of a Python call per row.
+SCORE_COLUMNS = ["rating_score", "carbon_score", "water_score"]
+
+def grade_score_columns(df):
+    """Map rating, Eco_Rating and Water_Rating to float32 score columns"""
+    if "rating" in df.columns:
+        rating = pd.to_numeric(df["rating"], errors="coerce")
+    else:
+        rating = pd.Series(0.0, index=df.index)
+    if "Eco_Rating" in df.columns:
+        # astype first: mapping a categorical column returns a categorical
+        carbon = df["Eco_Rating"].map(carbon_grade_to_score).astype(np.float64).fillna(0)
+    else:
+        carbon = pd.Series(0.0, index=df.index)
+    if "Water_Rating" in df.columns:
+        water = df["Water_Rating"].map(water_grade_to_score).astype(np.float64).fillna(0)
+    else:
+        water = pd.Series(0.0, index=df.index)
+    return pd.DataFrame(
+        {"rating_score": rating, "carbon_score": carbon, "water_score": water},
+        index=df.index,
+    ).astype(np.float32)
+
+def prepare_score_columns(df):
+    """Add the grade score columns to a catalog in place (no-op if present)"""
+    if df is None or all(col in df.columns for col in SCORE_COLUMNS):
+        return df
+    grades = grade_score_columns(df)
+    for col in SCORE_COLUMNS:
+        df[col] = grades[col]
+    return df
+
+def score_matrix(df):
+    """N x 3 float32 matrix of [rating, carbon, water] scores for df's rows"""
+    if all(col in df.columns for col in SCORE_COLUMNS):
+        return df[SCORE_COLUMNS].to_numpy(dtype=np.float32)
+    return grade_score_columns(df).to_numpy(dtype=np.float32)
+
+def weight_vector(weights):
+    """Weights dict -> float32 [rating, carbon, water], same defaults as calculate_product_score"""
+    if not isinstance(weights, dict):
+        weights = {"rating": 0.3, "carbon": 0.4, "water": 0.3}
+    eco_key = "eco" if "eco" in weights else "carbon"
+    return np.array([
+        float(weights.get("rating", 0.3)),
+        float(weights.get(eco_key, 0.4)),
+        float(weights.get("water", 0.3)),
+    ], dtype=np.float32)
+
+def score_products(df, weights):
+    """Vectorized calculate_product_score over every row of df (ndarray aligned with df)"""
+    # Row-wise dot product as multiply + sum rather than `@`: BLAS gemv rounds a
+    # row differently depending on the batch it is in, and callers compare the
+    # score of one row against scores computed over a different slice.
+    return (score_matrix(df) * weight_vector(weights)).sum(axis=1)
+
 def get_user_avg_price(purchased_df, df):
     return purchased_df['price'].mean() if not purchased_df.empty else None
 
 
 
 
-
 # from workable_data import workable_dataset, tag_vectors
 # print(workable_dataset.info())
 # print(tag_vectors.shape)
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""Stage timers for the recommendation pipeline, exposed in Prometheus text format.
+
+Enabled with METRICS_ENABLED=1. When disabled, stage() hands back one shared
+no-op context manager and timed() returns the function unchanged, so the
+instrumented code costs a flag check per stage.
+
+    with metrics.stage("home.vectorize"):
+        ...
+
+    @metrics.timed("user.fetch")
+    def fetch_user(user_id): ...
+"""
+import contextlib
+import functools
+import os
+import threading
+import time
+
+# --------------------------
+# Settings
+# --------------------------
+ENABLED = os.getenv("METRICS_ENABLED") == "1"
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_NOOP = contextlib.nullcontext()
+_lock = threading.Lock()
+# (family, label value) -> [bucket counts..., +Inf count, sum]
+_histograms = {}
+
+FAMILIES = {
+    "stage": ("recommender_stage_seconds", "stage", "Time spent in one stage of the recommendation pipeline"),
+    "request": ("recommender_request_seconds", "route", "Time to serve one HTTP request"),
+}
+
+def observe(name, seconds, family="stage"):
+    """Record one duration in the `family` histogram under label `name`"""
+    key = (family, name)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram[i] += 1
+                break
+        else:
+            histogram[len(BUCKETS)] += 1
+        histogram[-1] += seconds
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+def stage(name):
+    """Context manager timing the enclosed block as stage `name`"""
+    return _Stage(name) if ENABLED else _NOOP
+
+def timed(name):
+    """Decorator timing every call of the function as stage `name`"""
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+# --------------------------
+# Prometheus text format
+# --------------------------
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _histogram_lines():
+    with _lock:
+        snapshot = {key: list(values) for key, values in _histograms.items()}
+    lines = []
+    for family, (metric, label, help_text) in FAMILIES.items():
+        entries = sorted((name, values) for (fam, name), values in snapshot.items() if fam == family)
+        if not entries:
+            continue
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+        for name, values in entries:
+            labels = f'{label}="{_label(name)}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, values):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            total = cumulative + values[len(BUCKETS)]
+            lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {total}')
+            lines.append(f"{metric}_sum{{{labels}}} {values[-1]:.6f}")
+            lines.append(f"{metric}_count{{{labels}}} {total}")
+    return lines
+
+def render(caches=None, gauges=None):
+    """Prometheus exposition of the stage histograms, cache counters and gauges.
+
+    `caches` maps a cache name to a TTLCache; `gauges` maps a metric name to
+    (help text, value). Both are read at scrape time.
+    """
+    lines = _histogram_lines()
+    if caches:
+        stats = {name: cache.stats() for name, cache in caches.items()}
+        for field, kind, help_text in [
+            ("hits", "counter", "Cache lookups that found a live entry"),
+            ("misses", "counter", "Cache lookups that found nothing or an expired entry"),
+            ("evictions", "counter", "Entries dropped to stay under maxsize"),
+            ("coalesced", "counter", "Loads that waited on another caller's load instead of running their own"),
+            ("size", "gauge", "Entries currently cached"),
+        ]:
+            metric = f"recommender_cache_{field}" + ("_total" if kind == "counter" else "")
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+            lines += [f'{metric}{{cache="{_label(name)}"}} {values[field]}' for name, values in stats.items()]
+    for metric, (help_text, value) in (gauges or {}).items():
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge", f"{metric} {value}"]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,61 @@
+"""One pooled MongoClient per process, shared by the catalog and user modules.
+
+Pool size and timeouts come from the environment:
+
+    MONGO_MAX_POOL_SIZE               connections per server (default 100)
+    MONGO_MIN_POOL_SIZE               connections kept open when idle (default 0)
+    MONGO_MAX_IDLE_MS                 close pooled connections idle this long (default: never)
+    MONGO_CONNECT_TIMEOUT_MS          TCP connect (default 5000)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS wait for a usable server before failing (default 5000)
+    MONGO_SOCKET_TIMEOUT_MS           any single operation (default: none)
+"""
+import os
+import threading
+from dotenv import load_dotenv
+from pymongo import AsyncMongoClient, MongoClient
+
+load_dotenv()
+
+# --------------------------
+# Settings
+# --------------------------
+mongo_uri = os.getenv("MONGO_URI") or os.getenv("Mongo_URI")   # Optional at import
+DB_NAME = os.getenv("MONGO_DB", "test")
+
+def _ms(name, default=None):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+def client_options():
+    """Keyword arguments for MongoClient / AsyncMongoClient"""
+    options = {
+        "maxPoolSize": _ms("MONGO_MAX_POOL_SIZE", 100),
+        "minPoolSize": _ms("MONGO_MIN_POOL_SIZE", 0),
+        "connectTimeoutMS": _ms("MONGO_CONNECT_TIMEOUT_MS", 5000),
+        "serverSelectionTimeoutMS": _ms("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+        "maxIdleTimeMS": _ms("MONGO_MAX_IDLE_MS"),
+        "socketTimeoutMS": _ms("MONGO_SOCKET_TIMEOUT_MS"),
+    }
+    return {key: value for key, value in options.items() if value is not None}
+
+# --------------------------
+# Clients
+# --------------------------
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """The process-wide MongoClient (created on first call; connects lazily)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(mongo_uri, **client_options())
+    return _client
+
+def get_async_client():
+    """A new AsyncMongoClient with the same settings; it belongs to the event loop that uses it"""
+    return AsyncMongoClient(mongo_uri, **client_options())
+
+def get_database():
+    return get_client()[DB_NAME]
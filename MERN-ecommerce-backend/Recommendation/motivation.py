@@ -1,4 +1,13 @@
+import os
 import random
+from flask import Blueprint, jsonify, request
+
+# --------------------------
+# Settings
+# --------------------------
+MAX_BATCH_PROFILES = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+bp = Blueprint("motivation", __name__)
 
 def generate_motivation(user_profile):
     """
@@ -60,7 +69,7 @@ def generate_motivation(user_profile):
         ])
 
     # 🛒 Behavioral nudges from user actions
-    if user_profile["search_history"]:
+    if user_profile.get("search_history"):
         last_search = user_profile["search_history"][-1]
         messages.extend([
             f"Since you searched for '{last_search}', did you know eco alternatives could cut your footprint even more?",
@@ -68,7 +77,7 @@ def generate_motivation(user_profile):
             f"Your interest in '{last_search}' shows you care — eco options can amplify your impact 🌍."
         ])
 
-    if user_profile["purchase_history"]:
+    if user_profile.get("purchase_history"):
         last_purchase = user_profile["purchase_history"][-1]
         messages.extend([
             f"Your purchase of '{last_purchase}' was a sustainable win 🎉.",
@@ -83,16 +92,45 @@ def generate_motivation(user_profile):
     return final_message
 
 
+# --------------------------
+# Endpoints
+# --------------------------
+@bp.route("/api/motivation", methods=["POST"])
+def motivation_message():
+    profile = request.get_json(silent=True)
+    if not isinstance(profile, dict):
+        return jsonify({"error": "bad_request", "message": "body must be a profile object"}), 400
+    try:
+        return jsonify({"message": generate_motivation(profile), "source": "python"})
+    except Exception as e:
+        return jsonify({"error": "internal", "message": str(e)}), 500
+
+@bp.route("/api/motivation/batch", methods=["POST"])
+def motivation_batch():
+    profiles = (request.get_json(silent=True) or {}).get("profiles")
+    if not isinstance(profiles, list) or not profiles:
+        return jsonify({"error": "bad_request", "message": "profiles must be a non-empty list"}), 400
+    if len(profiles) > MAX_BATCH_PROFILES:
+        return jsonify({"error": "bad_request", "message": f"at most {MAX_BATCH_PROFILES} profiles per call"}), 400
+    if not all(isinstance(profile, dict) for profile in profiles):
+        return jsonify({"error": "bad_request", "message": "every profile must be an object"}), 400
+    try:
+        return jsonify({"results": [generate_motivation(profile) for profile in profiles]})
+    except Exception as e:
+        return jsonify({"error": "internal", "message": str(e)}), 500
+
+
 # ------------------- Example -------------------
-user_profile = {
-    "search_history": ["vegan soap", "eco toothpaste"],
-    "purchase_history": ["GEN0", "GEN1"],
-    "weights": {"carbon": 0.4, "water": 0.3, "rating": 0.3},
-    "price_tolerance": 0.2,
-    "eco_score": 72,
-    "water_score": 85,
-    "carbon_saved": 14.2,
-    "water_saved": 320
-}
-
-print(generate_motivation(user_profile))
\ No newline at end of file
+if __name__ == "__main__":
+    user_profile = {
+        "search_history": ["vegan soap", "eco toothpaste"],
+        "purchase_history": ["GEN0", "GEN1"],
+        "weights": {"carbon": 0.4, "water": 0.3, "rating": 0.3},
+        "price_tolerance": 0.2,
+        "eco_score": 72,
+        "water_score": 85,
+        "carbon_saved": 14.2,
+        "water_saved": 320
+    }
+
+    print(generate_motivation(user_profile))
@@ -0,0 +1,148 @@
+"""Offline item-to-item neighbour table for cart alternatives.
+
+    python -m Recommendation.neighbors --neighbors 100
+
+Stores, for every catalog row, its top-M most similar rows by title, category
+and tags as memory-mappable .npy arrays next to workable_dataset.parquet.
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+import numpy as np
+import scipy.sparse as sp
+from . import workable_data
+
+# --------------------------
+# Settings
+# --------------------------
+NEIGHBOR_COUNT = int(os.getenv("NEIGHBOR_COUNT", "100"))
+CHUNK_ROWS = 256
+# Blend of cosine similarities used to pick neighbours
+TITLE_WEIGHT = 0.5
+CATEGORY_WEIGHT = 0.2
+TAG_WEIGHT = 0.3
+
+_loaded = {"path": None, "mtime": None, "table": None}
+
+def table_path(cache_file=None):
+    """Directory holding the neighbour arrays for a given catalog cache file"""
+    return os.path.splitext(cache_file or workable_data.CACHE_FILE)[0] + ".neighbors"
+
+# --------------------------
+# Build
+# --------------------------
+def build_neighbor_table(count=NEIGHBOR_COUNT, path=None, chunk_rows=CHUNK_ROWS):
+    """Compute top-`count` neighbours for every row of the loaded catalog and save them.
+
+    Files (row-aligned with workable_dataset):
+      neighbors.npy  int32   (N, M) neighbour row positions, most similar first
+      title_sim.npy  float16 (N, M) title cosine similarity to each neighbour
+      ids.npy        str     (N,)   _id per row, to detect rows newer than the table
+      meta.json
+    """
+    path = path or table_path()
+    catalog = workable_data.catalog()
+    df = catalog.workable_dataset
+    n = len(df)
+    count = max(0, min(count, n - 1))
+
+    # Weighted concatenation: X @ X.T == sum of weighted cosine similarities
+    blended = sp.hstack([
+        np.sqrt(TITLE_WEIGHT) * catalog.product_vectors,
+        np.sqrt(CATEGORY_WEIGHT) * catalog.category_vectors,
+        np.sqrt(TAG_WEIGHT) * catalog.tag_vectors,
+    ], format="csr").astype(np.float32)
+    blended_t = blended.T.tocsc()
+    titles = catalog.product_vectors.tocsr()
+
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    neighbors = np.lib.format.open_memmap(os.path.join(tmp, "neighbors.npy"), mode="w+", dtype=np.int32, shape=(n, count))
+    title_sim = np.lib.format.open_memmap(os.path.join(tmp, "title_sim.npy"), mode="w+", dtype=np.float16, shape=(n, count))
+
+    started = time.time()
+    for start in range(0, n, chunk_rows):
+        stop = min(n, start + chunk_rows)
+        sims = (blended[start:stop] @ blended_t).toarray()
+        sims[np.arange(stop - start), np.arange(start, stop)] = -np.inf   # never your own neighbour
+        if count:
+            top = np.argpartition(-sims, count - 1, axis=1)[:, :count]
+            order = np.argsort(-np.take_along_axis(sims, top, axis=1), axis=1, kind="stable")
+            top = np.take_along_axis(top, order, axis=1)
+            sources = np.repeat(np.arange(start, stop), count)
+            pair_sim = np.asarray(titles[sources].multiply(titles[top.ravel()]).sum(axis=1)).ravel()
+            neighbors[start:stop] = top
+            title_sim[start:stop] = pair_sim.reshape(stop - start, count)
+    neighbors.flush()
+    title_sim.flush()
+    del neighbors, title_sim
+
+    np.save(os.path.join(tmp, "ids.npy"), df["_id"].astype(str).to_numpy(dtype=str))
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"rows": n, "neighbors": count, "built_at": time.time(),
+                   "seconds": round(time.time() - started, 1)}, f)
+
+    # Swap the finished table into place
+    old = path + ".old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+    print(f"✅ Neighbour table ({n} x {count}) saved to {path}")
+    return path
+
+# --------------------------
+# Lookup
+# --------------------------
+def load_neighbor_table(path=None):
+    """Memory-map the neighbour table (cached; reloaded when it is rebuilt). None if absent."""
+    path = path or table_path()
+    meta_file = os.path.join(path, "meta.json")
+    try:
+        mtime = os.path.getmtime(meta_file)
+    except OSError:
+        return None
+    if _loaded["path"] == path and _loaded["mtime"] == mtime:
+        return _loaded["table"]
+    table = {
+        "neighbors": np.load(os.path.join(path, "neighbors.npy"), mmap_mode="r"),
+        "title_sim": np.load(os.path.join(path, "title_sim.npy"), mmap_mode="r"),
+        "ids": np.load(os.path.join(path, "ids.npy"), mmap_mode="r"),
+    }
+    _loaded.update(path=path, mtime=mtime, table=table)
+    return table
+
+def lookup(row):
+    """(neighbour rows, title similarities) for a catalog row, or None to use the live path.
+
+    None when there is no table or the row is newer than it; neighbours whose
+    row now holds a different product (catalog patched since the build) are dropped.
+    """
+    table = load_neighbor_table()
+    if table is None:
+        return None
+    ids = workable_data.catalog().workable_dataset["_id"].to_numpy()
+    if row >= len(table["ids"]) or str(table["ids"][row]) != str(ids[row]):
+        return None
+    rows = np.asarray(table["neighbors"][row], dtype=np.int64)
+    sims = np.asarray(table["title_sim"][row], dtype=np.float64)
+    valid = rows < len(ids)
+    rows, sims = rows[valid], sims[valid]
+    same = np.asarray(table["ids"][rows]) == np.asarray(ids[rows], dtype=str)
+    return rows[same], sims[same]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the cart neighbour table")
+    parser.add_argument("--neighbors", type=int, default=NEIGHBOR_COUNT)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+    build_neighbor_table(args.neighbors, chunk_rows=args.chunk_rows)
+
+
+if __name__ == "__main__":
+    main()
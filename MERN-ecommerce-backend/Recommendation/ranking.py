@@ -0,0 +1,95 @@
+import base64
+import uuid
+import numpy as np
+from .cache import TTLCache
+
+# --------------------------
+# Pagination settings
+# --------------------------
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+SNAPSHOT_TTL = 60      # seconds a ranking snapshot stays valid for follow-up pages
+SNAPSHOT_PAGES = 5     # pages ranked up-front when a snapshot is (re)built
+
+# token -> {"key": ..., "ids": [...], "complete": bool}
+snapshots = TTLCache(maxsize=2048, ttl=SNAPSHOT_TTL)
+
+# --------------------------
+# Top-k selection
+# --------------------------
+def top_k_indices(scores, k=None):
+    """Positions of the k highest scores, best first (ties broken by position).
+
+    Uses argpartition so the cost is O(N + k log k) instead of a full sort;
+    NaN scores rank last. k=None ranks everything.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    n = scores.shape[0]
+    if n == 0 or (k is not None and k <= 0):
+        return np.empty(0, dtype=np.intp)
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+    if k is None or k >= n:
+        candidates = np.arange(n)
+    else:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order]
+
+# --------------------------
+# Cursor pagination
+# --------------------------
+def encode_cursor(token, offset):
+    return base64.urlsafe_b64encode(f"{token}:{offset}".encode()).decode("ascii")
+
+def decode_cursor(cursor):
+    """Cursor string -> (snapshot token, offset); raises ValueError if malformed"""
+    try:
+        token, offset = base64.urlsafe_b64decode(cursor.encode("ascii")).decode().rsplit(":", 1)
+        offset = int(offset)
+    except Exception:
+        raise ValueError("invalid cursor")
+    if offset < 0:
+        raise ValueError("invalid cursor")
+    return token, offset
+
+def parse_page_args(args):
+    """(limit, cursor) from request args; (None, None) means a legacy unpaginated call"""
+    limit = args.get("limit")
+    cursor = args.get("cursor") or None
+    if limit is None and cursor is None:
+        return None, None
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_LIMIT
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    if cursor is not None:
+        decode_cursor(cursor)
+    return max(1, min(limit, MAX_LIMIT)), cursor
+
+def ranked_page(key, compute, limit=DEFAULT_LIMIT, cursor=None):
+    """Serve one page of a ranking, reusing a briefly cached snapshot.
+
+    `compute(k)` must return the best k ids in order. The snapshot is built
+    `SNAPSHOT_PAGES` pages deep, so follow-up pages are slices of it and only
+    a cursor past its end triggers a deeper recompute.
+    """
+    token, offset = decode_cursor(cursor) if cursor else (None, 0)
+    end = offset + limit
+
+    snapshot = snapshots.get(token) if token else None
+    if snapshot is not None and snapshot["key"] != key:
+        snapshot, token = None, None
+    if snapshot is None or (end > len(snapshot["ids"]) and not snapshot["complete"]):
+        depth = max(end, limit * SNAPSHOT_PAGES)
+        ids = list(compute(depth))
+        snapshot = {"key": key, "ids": ids, "complete": len(ids) < depth}
+        token = token or uuid.uuid4().hex
+        snapshots.set(token, snapshot)
+
+    ids = snapshot["ids"]
+    items = ids[offset:end]
+    has_more = end < len(ids) or not snapshot["complete"]
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(token, end) if items and has_more else None,
+    }
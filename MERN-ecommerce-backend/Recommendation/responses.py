@@ -0,0 +1,111 @@
+"""JSON encoding, pre-stringified catalog ids and conditional (ETag/304) responses.
+
+Rankings only depend on the catalog content, the caller's ranking fields
+and the request arguments, so those make the ETag. The catalog enters as its
+content fingerprint, not the per-process version, so every worker (and every
+restart) gives the same catalog the same ETag. A poll whose
+If-None-Match still matches gets a 304 before anything is ranked, and an
+unchanged response is served from the encoded-body cache.
+
+orjson is used when installed; the standard json module otherwise.
+"""
+import base64
+import hashlib
+import json
+import os
+from datetime import datetime
+import numpy as np
+from bson import ObjectId
+from flask import Response, request
+from . import metrics
+from . import workable_data
+from .cache import TTLCache
+
+try:
+    import orjson
+except ImportError:   # optional: pip install orjson
+    orjson = None
+
+# --------------------------
+# Settings
+# --------------------------
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "4096"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+
+# ETag -> encoded 200 body
+bodies = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+
+# --------------------------
+# Encoding
+# --------------------------
+def _default(value):
+    """Values neither JSON backend handles natively"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(bytes(value)).decode("ascii")
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    if hasattr(value, "tolist"):   # pandas Series / Index
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def dumps(payload):
+    """Compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def json_response(payload, status=200):
+    return Response(dumps(payload), status=status, mimetype="application/json")
+
+# --------------------------
+# Catalog ids
+# --------------------------
+_ids = {"fingerprint": None, "column": None, "values": None}
+
+def catalog_ids(df, id_col):
+    """df[id_col] as an object array of str, kept per catalog fingerprint for the live catalog"""
+    global _ids
+    catalog = workable_data.catalog()
+    if df is not catalog.workable_dataset:
+        return df[id_col].astype(str).to_numpy(dtype=object)
+    ids = _ids   # one read: another thread may replace it
+    if ids["fingerprint"] != catalog.fingerprint or ids["column"] != id_col:
+        values = df[id_col].astype(str).to_numpy(dtype=object)
+        ids = {"fingerprint": catalog.fingerprint, "column": id_col, "values": values}
+        _ids = ids
+    return ids["values"]
+
+# --------------------------
+# Conditional responses
+# --------------------------
+def etag_for(*parts):
+    """ETag of one response: the catalog fingerprint plus whatever else it depends on"""
+    payload = json.dumps([workable_data.catalog().fingerprint, *parts], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def _tagged(response, etag):
+    # no-cache: clients may store the body but must revalidate it every time
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+def conditional_response(etag, build, name):
+    """304 if the client holds `etag`, else the cached body, else build() -> (payload, status).
+
+    Only 200 bodies are cached. Encoding is timed as stage "<name>.serialize".
+    """
+    if etag in request.if_none_match:
+        return _tagged(Response(status=304), etag)
+    body = bodies.get(etag)
+    if body is None:
+        payload, status = build()
+        with metrics.stage(f"{name}.serialize"):
+            if status != 200:
+                return json_response(payload, status)
+            body = dumps(payload)
+        bodies.set(etag, body)
+    return _tagged(Response(body, status=200, mimetype="application/json"), etag)
@@ -0,0 +1,201 @@
+"""Memory-mapped catalog snapshots shared by every worker process.
+
+    python -m Recommendation.snapshot
+
+Writes the loaded catalog next to workable_dataset.parquet:
+
+    workable_dataset.snapshot/
+        CURRENT                      name of the live version
+        <version>/
+            catalog.arrow            catalog minus the hot numeric columns (Arrow IPC)
+            columns/<name>.npy       hot numeric columns
+            <matrix>.<part>.npy      data/indices/indptr of the CSR matrices and CSC indexes
+            vectorizers.pkl
+            meta.json
+
+Workers open the arrays with np.load(mmap_mode="r"), so they all share one
+page-cache copy. A new version goes live by rewriting CURRENT; running
+workers pick it up without a restart from start_follower(), which calls
+refresh_if_changed() on a background thread, never on the request path.
+"""
+import argparse
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import scipy.sparse as sp
+from . import workable_data
+
+# --------------------------
+# Settings
+# --------------------------
+HOT_COLUMNS = ["price", "rating", "rating_score", "carbon_score", "water_score"]
+CHECK_INTERVAL = float(os.getenv("SNAPSHOT_CHECK_INTERVAL", "5"))   # seconds between CURRENT checks
+KEEP_VERSIONS = 2
+# name -> (matrix global, index global)
+MATRICES = {
+    "tag": ("tag_vectors", "tag_index"),
+    "product": ("product_vectors", "product_index"),
+    "category": ("category_vectors", "category_index"),
+}
+
+_live = {"version": None, "checked": 0.0}
+_swap_lock = threading.Lock()
+
+def snapshot_dir(cache_file=None):
+    return os.path.splitext(cache_file or workable_data.CACHE_FILE)[0] + ".snapshot"
+
+def current_version(path=None):
+    """Name of the live version, or None if no snapshot has been written"""
+    try:
+        with open(os.path.join(path or snapshot_dir(), "CURRENT"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+# --------------------------
+# Write
+# --------------------------
+def _save_sparse(folder, name, matrix):
+    for part in ["data", "indices", "indptr"]:
+        np.save(os.path.join(folder, f"{name}.{part}.npy"), getattr(matrix, part))
+
+def write_snapshot(path=None):
+    """Write the catalog, matrices and vectorizers as a new version and make it current"""
+    path = path or snapshot_dir()
+    catalog = workable_data.catalog()
+    df = catalog.workable_dataset   # score columns included, so workers share them too
+    version = f"{int(time.time() * 1000)}-{workable_data.dataset_fingerprint(df)[:12]}"
+    tmp = os.path.join(path, version + ".tmp")
+    os.makedirs(os.path.join(tmp, "columns"))
+
+    hot = [col for col in HOT_COLUMNS if col in df.columns and pd.api.types.is_numeric_dtype(df[col])]
+    for col in hot:
+        np.save(os.path.join(tmp, "columns", f"{col}.npy"), df[col].to_numpy())
+    table = pa.Table.from_pandas(df.drop(columns=hot), preserve_index=False)
+    with pa.OSFile(os.path.join(tmp, "catalog.arrow"), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    shapes = {}
+    for name, (matrix_name, index_name) in MATRICES.items():
+        matrix = getattr(catalog, matrix_name).tocsr()
+        _save_sparse(tmp, f"{name}.csr", matrix)
+        _save_sparse(tmp, f"{name}.csc", getattr(catalog, index_name))
+        shapes[name] = list(matrix.shape)
+    with open(os.path.join(tmp, "vectorizers.pkl"), "wb") as f:
+        pickle.dump({
+            "tag": catalog.vectorizer,
+            "product": catalog.product_vectorizer,
+            "category": catalog.category_vectorizer,
+        }, f, protocol=pickle.HIGHEST_PROTOCOL)
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"rows": len(df), "columns": list(df.columns), "hot": hot, "shapes": shapes,
+                   "fingerprint": catalog.fingerprint}, f)
+
+    # Publish: rename the version into place, then swap the CURRENT pointer
+    os.replace(tmp, os.path.join(path, version))
+    pointer = os.path.join(path, f"CURRENT.{os.getpid()}.tmp")
+    with open(pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(path, "CURRENT"))
+
+    versions = sorted(name for name in os.listdir(path) if os.path.isdir(os.path.join(path, name)) and not name.endswith(".tmp"))
+    for old in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(path, old), ignore_errors=True)
+    print(f"✅ Catalog snapshot {version} written to {path}")
+    return version
+
+# --------------------------
+# Load
+# --------------------------
+def _load_sparse(folder, name, shape, kind):
+    parts = [np.load(os.path.join(folder, f"{name}.{kind}.{part}.npy"), mmap_mode="r") for part in ["data", "indices", "indptr"]]
+    matrix_type = sp.csr_matrix if kind == "csr" else sp.csc_matrix
+    return matrix_type(tuple(parts), shape=tuple(shape), copy=False)
+
+def load_snapshot(version=None, path=None):
+    """Open one snapshot version; arrays are read-only memory maps"""
+    path = path or snapshot_dir()
+    version = version or current_version(path)
+    folder = os.path.join(path, version)
+    with open(os.path.join(folder, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+
+    with pa.memory_map(os.path.join(folder, "catalog.arrow")) as source:
+        df = pa.ipc.open_file(source).read_all().to_pandas()
+    for col in meta["hot"]:
+        # A Series built with copy=False keeps the memmap instead of copying it into the frame
+        column = pd.Series(np.load(os.path.join(folder, "columns", f"{col}.npy"), mmap_mode="r"), copy=False)
+        df.insert(meta["columns"].index(col), col, column)
+
+    with open(os.path.join(folder, "vectorizers.pkl"), "rb") as f:
+        vectorizers = pickle.load(f)
+    # Snapshots written before fingerprints existed: the version is unique per content too
+    state = {"version": version, "workable_dataset": df, "fingerprint": meta.get("fingerprint") or version}
+    for name, (matrix_name, index_name) in MATRICES.items():
+        shape = meta["shapes"][name]
+        state[matrix_name] = _load_sparse(folder, name, shape, "csr")
+        state[index_name] = _load_sparse(folder, name, shape, "csc")
+    state["vectorizer"] = vectorizers["tag"]
+    state["product_vectorizer"] = vectorizers["product"]
+    state["category_vectorizer"] = vectorizers["category"]
+    return state
+
+def install(state):
+    """Publish a loaded snapshot as workable_data's current catalog"""
+    fields = {name: value for name, value in state.items() if name != "version"}
+    workable_data.publish(workable_data.CatalogSnapshot(
+        price_index=workable_data.build_price_index(state["workable_dataset"]), **fields
+    ))
+    _live["version"] = state["version"]
+    print(f"📂 Catalog snapshot {state['version']} installed ({len(state['workable_dataset'])} rows)")
+
+def refresh_if_changed(force=False):
+    """Install the current snapshot if CURRENT moved (checked at most every CHECK_INTERVAL s)"""
+    now = time.monotonic()
+    if not force and now - _live["checked"] < CHECK_INTERVAL:
+        return False
+    if not _swap_lock.acquire(blocking=False):
+        return False   # another thread is already checking
+    try:
+        _live["checked"] = now
+        version = current_version()
+        if version is None or version == _live["version"]:
+            return False
+        install(load_snapshot(version))
+        return True
+    finally:
+        _swap_lock.release()
+
+def _follow_loop(interval, stop):
+    while not stop.wait(interval):
+        try:
+            refresh_if_changed(force=True)
+        except Exception as e:   # half-written or removed version; try again next tick
+            print("⚠ Catalog snapshot check failed:", e)
+
+def start_follower(interval=None):
+    """Install new snapshot versions every `interval` seconds on a daemon thread; returns (thread, stop_event)"""
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=_follow_loop, args=(interval or CHECK_INTERVAL, stop), name="catalog-snapshot", daemon=True,
+    )
+    thread.start()
+    return thread, stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a memory-mapped catalog snapshot")
+    parser.add_argument("--path", default=None)
+    args = parser.parse_args()
+    write_snapshot(args.path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,65 @@
+import contextlib
+import contextvars
+import hashlib
+import itertools
+import json
+import pickle
+import shutil
+import threading
+import time
+import numpy as np
 import pandas as pd
-from pymongo import MongoClient
+import pyarrow as pa
+import pyarrow.parquet as pq
+import scipy.sparse as sp
+import sklearn
+from . import mongo
 from dotenv import load_dotenv
-import spacy
-from spacy.lang.en.stop_words import STOP_WORDS
 import os
 from sklearn.feature_extraction.text import TfidfVectorizer
 
+try:
+    import fcntl   # POSIX only; see _cache_file_lock()
+except ImportError:
+    fcntl = None
+
 # --------------------------
 # Load environment variables
 # --------------------------
 load_dotenv()
-mongo_uri = os.getenv("MONGO_URI")   # Optional at import; required only when refreshing cache
+mongo_uri = mongo.mongo_uri   # Optional at import; required only when refreshing cache
 
 # --------------------------
 # Mongo Connection
 # --------------------------
-client = MongoClient(mongo_uri)
-db = client["test"]
+client = mongo.get_client()
+db = mongo.get_database()
 collection = db["products"]
 
 # --------------------------
 # Cache file path
 # --------------------------
-CACHE_FILE = "workable_dataset.parquet"
+CACHE_FILE = os.getenv("WORKABLE_CACHE_FILE", "workable_dataset.parquet")
+# Fitted vectorizers + matrices, one subdirectory per dataset content hash
+ARTIFACT_DIR = os.path.splitext(CACHE_FILE)[0] + ".vectors"
+# Change signature of the collection the cache file was last written from
+SIGNATURE_FILE = os.path.splitext(CACHE_FILE)[0] + ".signature.json"
+# Held by the one process streaming the DB into the cache file
+LOCK_FILE = os.path.splitext(CACHE_FILE)[0] + ".lock"
 
 # --------------------------
-# Load NLP
+# NLP (loaded on first preprocessing call)
 # --------------------------
-nlp = spacy.load("en_core_web_sm")
+nlp = None
+STOP_WORDS = None
+
+def get_nlp():
+    global nlp, STOP_WORDS
+    if nlp is None:
+        import spacy
+        from spacy.lang.en.stop_words import STOP_WORDS
+        nlp = spacy.load("en_core_web_sm")
+    return nlp
 
 # --------------------------
 # Globals
@@ -40,91 +72,620 @@ product_vectors = None
 category_vectorizer = None
 category_vectors = None
 
+# Inverted indexes (CSC: column = term, postings = rows containing it)
+tag_index = None
+product_index = None
+category_index = None
+
+# Sorted price index: {"prices", "rows", "by_category": {name: (prices, rows)}}
+price_index = None
+
+# Bumped every time the catalog or its matrices change; result caches key on it
+catalog_version = 0
+
+# --------------------------
+# Catalog snapshots
+# --------------------------
+SNAPSHOT_FIELDS = (
+    "workable_dataset",
+    "vectorizer", "tag_vectors",
+    "product_vectorizer", "product_vectors",
+    "category_vectorizer", "category_vectors",
+    "tag_index", "product_index", "category_index",
+    "price_index",
+    "fingerprint",   # content hash: equal catalogs share it across processes and restarts
+    "signature",     # collection signature the dataset was read at; None if unknown
+    "version", "published_at",
+)
+
+class CatalogSnapshot:
+    """One consistent catalog: the dataset, its vectorizers and matrices, and the indexes built from them.
+
+    Never modified once built. A refresh builds a new snapshot and publish()
+    makes it current with a single reference assignment, so a reader holding
+    one never sees a new vectorizer paired with an old matrix.
+    """
+    __slots__ = SNAPSHOT_FIELDS
+
+    def __init__(self, **fields):
+        for name in SNAPSHOT_FIELDS:
+            object.__setattr__(self, name, fields.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CatalogSnapshot is immutable; use replace()")
+
+    def replace(self, **changes):
+        fields = {name: getattr(self, name) for name in SNAPSHOT_FIELDS}
+        fields.update(changes)
+        return CatalogSnapshot(**fields)
+
+current = None   # the published CatalogSnapshot
+_publish_lock = threading.Lock()
+_pinned = contextvars.ContextVar("pinned_catalog", default=None)
+
+def catalog():
+    """The snapshot pinned for the running request (see pin()), else the current one"""
+    snapshot = _pinned.get()
+    return snapshot if snapshot is not None else current
+
+def pin():
+    """Keep serving the current snapshot to this request/context until unpin(token)"""
+    return _pinned.set(current)
+
+def unpin(token):
+    _pinned.reset(token)
+
+def publish(snapshot, base=None):
+    """Stamp `snapshot` with the next catalog version and make it current; returns it.
+
+    With `base`, publish only if `base` is still current (compare-and-swap),
+    so a snapshot derived from it cannot overwrite a newer one; returns None
+    when something else was published in between.
+    """
+    global current, catalog_version
+    with _publish_lock:
+        if base is not None and current is not base:
+            return None
+        catalog_version += 1
+        snapshot = snapshot.replace(
+            version=catalog_version, published_at=time.time(),
+            fingerprint=snapshot.fingerprint or content_fingerprint(snapshot.workable_dataset),
+        )
+        current = snapshot
+        # Module-level names mirror the current snapshot for scripts and offline tools;
+        # request paths read catalog() instead
+        globals().update({name: getattr(snapshot, name) for name in SNAPSHOT_FIELDS if name != "version"})
+    return snapshot
+
 # --------------------------
 # Functions
 # --------------------------
+# Batched tag extraction
+SPACY_BATCH_SIZE = int(os.getenv("SPACY_BATCH_SIZE", "1000"))
+SPACY_PROCESSES = int(os.getenv("SPACY_PROCESSES", "1"))
+
+def tags_from_doc(doc):
+    return ','.join(token.text for token in doc if token.text.isalnum() and token.text not in STOP_WORDS)
+
 def clean_and_extract_tags(text):
     """Cleans text and extracts alphanumeric tokens excluding stopwords"""
     if not isinstance(text, str):
         text = str(text)
-    doc = nlp(text.lower())
-    tags = [token.text for token in doc if token.text.isalnum() and token.text not in STOP_WORDS]
-    return ','.join(tags)
+    doc = get_nlp()(text.lower())
+    return tags_from_doc(doc)
+
+def extract_tags(values, batch_size=None, n_process=None):
+    """clean_and_extract_tags for a whole column, parsing each distinct string once.
+
+    Only token text is used, so every pipeline component is disabled and
+    the unique strings go through nlp.pipe in batches (n_process > 1 forks workers).
+    """
+    texts = [(value if isinstance(value, str) else str(value)).lower() for value in values]
+    unique = list(dict.fromkeys(texts))
+    nlp = get_nlp()
+    docs = nlp.pipe(
+        unique,
+        batch_size=batch_size or SPACY_BATCH_SIZE,
+        n_process=n_process or SPACY_PROCESSES,
+        disable=nlp.pipe_names,
+    )
+    tags = {text: tags_from_doc(doc) for text, doc in zip(unique, docs)}
+    return [tags[text] for text in texts]
 
 def preprocess_dataset(df):
     """Generate tags column from important fields"""
     columns_to_extract_tags_from = ['title', 'brand', 'category_name']
     for column in columns_to_extract_tags_from:
         if column in df.columns:
-            df[column] = df[column].apply(clean_and_extract_tags)
+            df[column] = extract_tags(df[column].tolist())
         else:
             df[column] = ""  # avoid KeyError if missing
-    df['Tags'] = df[columns_to_extract_tags_from].apply(lambda row: ', '.join(row), axis=1)
+    df['Tags'] = df['title'] + ', ' + df['brand'] + ', ' + df['category_name']
     return df
 
-def load_workable_data():
-    """Fetch all data from Mongo into a DataFrame"""
-    data = list(collection.find({}))
-    df = pd.DataFrame(data)
+# --------------------------
+# Compact in-memory schema
+# --------------------------
+# Low-cardinality text becomes pandas categoricals (grades end up as int8 codes)
+CATEGORICAL_COLUMNS = ["brand", "category_name", "Eco_Rating", "Water_Rating"]
+MAX_CATEGORY_RATIO = 0.5   # a column stays plain strings if more than half its values are distinct
+FLOAT32_COLUMNS = ["price", "rating"]
+STRING_DTYPE = pd.StringDtype("pyarrow")
+
+def compact_catalog(df):
+    """Apply the compact schema to a catalog frame in place: str ids, float32 numbers, categoricals"""
+    for col in ["_id", "product_id"]:
+        if col in df.columns:
+            df[col] = df[col].astype(str)
+    for col in FLOAT32_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(np.float32)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            if df[col].nunique() <= MAX_CATEGORY_RATIO * len(df):
+                # Text columns get "" for missing (what process_vectorizers fills in anyway);
+                # grades keep NaN, which scores as 0
+                values = df[col] if col.endswith("_Rating") else df[col].fillna("")
+                df[col] = values.astype("category")
+    for col in df.columns:
+        if df[col].dtype == object:
+            # Arrow-backed strings instead of Python objects. Explicit, because
+            # astype(str) only does this on pandas 3; missing values stay missing.
+            df[col] = df[col].astype(STRING_DTYPE)
     return df
 
+# --------------------------
+# Streaming ingest
+# --------------------------
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "5000"))
+# Only the fields the recommenders read; Tags is derived by preprocess_dataset
+CATALOG_SCHEMA = pa.schema([
+    ("_id", pa.string()),
+    ("product_id", pa.string()),
+    ("title", pa.string()),
+    ("brand", pa.string()),
+    ("category_name", pa.string()),
+    ("price", pa.float64()),
+    ("rating", pa.float64()),
+    ("Eco_Rating", pa.string()),
+    ("Water_Rating", pa.string()),
+    ("Tags", pa.string()),
+])
+DOCUMENT_FIELDS = [name for name in CATALOG_SCHEMA.names if name != "Tags"]
+PROJECTION = {name: 1 for name in DOCUMENT_FIELDS}
+
+def documents_to_frame(docs):
+    """Projected, typed and preprocessed DataFrame for a list of product documents"""
+    df = pd.DataFrame(list(docs), columns=DOCUMENT_FIELDS)
+    for col in ["_id", "product_id"]:
+        df[col] = df[col].astype(str)
+    for col in ["price", "rating"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    for col in ["Eco_Rating", "Water_Rating"]:
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    # A text field no document has is treated as missing (empty), not as "nan"
+    missing = [col for col in ["title", "brand", "category_name"] if df[col].isna().all()]
+    return preprocess_dataset(df.drop(columns=missing))[CATALOG_SCHEMA.names]
+
+def iter_catalog_batches(batch_size=None):
+    """Arrow record batches of the projected catalog, streamed batch_size documents at a time"""
+    batch_size = batch_size or INGEST_BATCH_SIZE
+    cursor = collection.find({}, PROJECTION, batch_size=batch_size)
+    while True:
+        docs = list(itertools.islice(cursor, batch_size))
+        if not docs:
+            break
+        yield pa.RecordBatch.from_pandas(documents_to_frame(docs), schema=CATALOG_SCHEMA, preserve_index=False)
+
+def write_catalog_parquet(path, batch_size=None, progress=None):
+    """Stream the catalog into a parquet file at `path` (temp file + rename); returns the row count.
+
+    `progress(rows)` is called after every batch with the rows written so far.
+    """
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    rows = 0
+    try:
+        with pq.ParquetWriter(tmp, CATALOG_SCHEMA) as writer:
+            for batch in iter_catalog_batches(batch_size):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+                if progress is not None:
+                    progress(rows)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return rows
+
+def fit_vectorizer(texts):
+    """(fitted TfidfVectorizer, L2-normalised CSR matrix) for one text column"""
+    vec = TfidfVectorizer(stop_words='english')
+    return vec, vec.fit_transform(texts)
+
+def fill_text(values):
+    """values with "" for missing; categoricals get "" as a category first (pandas 2 requires it)"""
+    if not values.hasnans:
+        return values
+    if isinstance(values.dtype, pd.CategoricalDtype) and "" not in values.cat.categories:
+        values = values.cat.add_categories("")
+    return values.fillna("")
+
+def build_snapshot(df):
+    """Fit (or load) the vectorizers for `df` and derive its indexes; the result is not published yet"""
+    from .common_code import prepare_score_columns
+    # Shallow copy: the columns filled in below never touch the caller's frame
+    df = df.copy(deep=False)
+    for column in VECTOR_COLUMNS.values():
+        df[column] = fill_text(df[column])
+    prepare_score_columns(df)
+
+    key = dataset_fingerprint(df)
+    fitted = load_artifacts(key)
+    if fitted is not None:
+        print(f"📂 Loaded TF-IDF vectorizers ({key[:12]})")
+    else:
+        print("🔄 Building TF-IDF vectorizers...")
+        fitted = [fit_vectorizer(df[column]) for column in VECTOR_COLUMNS.values()]
+        try:
+            save_artifacts(key, fitted)
+        except OSError as e:
+            print("⚠ Could not save TF-IDF artifacts:", e)
+        print("✅ TF-IDF vectorizers ready!")
+    return assemble_snapshot(df, fitted)
+
+def assemble_snapshot(df, fitted, fingerprint=None):
+    """CatalogSnapshot from a dataset and its [(vectorizer, matrix)] for tag/product/category"""
+    (tag_vec, tag_matrix), (product_vec, product_matrix), (category_vec, category_matrix) = fitted
+    return CatalogSnapshot(
+        workable_dataset=df,
+        vectorizer=tag_vec, tag_vectors=tag_matrix,
+        product_vectorizer=product_vec, product_vectors=product_matrix,
+        category_vectorizer=category_vec, category_vectors=category_matrix,
+        tag_index=tag_matrix.tocsc(),
+        product_index=product_matrix.tocsc(),
+        category_index=category_matrix.tocsc(),
+        price_index=build_price_index(df),
+        fingerprint=fingerprint or content_fingerprint(df),
+    )
+
 def process_vectorizers():
-    """Build TF-IDF vectorizers for recommendation system"""
-    global vectorizer, tag_vectors
-    global product_vectorizer, product_vectors
-    global category_vectorizer, category_vectors
+    """Build TF-IDF vectorizers for workable_dataset and publish the result (reused from disk if the dataset is unchanged)"""
+    return publish(build_snapshot(workable_dataset))
+
+# --------------------------
+# Vectorizer artifacts
+# --------------------------
+# artifact name -> text column it is fit on
+VECTOR_COLUMNS = {"tag": "Tags", "product": "title", "category": "category_name"}
+
+def dataset_fingerprint(df):
+    """Content hash of the text the vectorizers are fit on (plus the sklearn version)"""
+    digest = hashlib.sha1(sklearn.__version__.encode("utf-8"))
+    for column in VECTOR_COLUMNS.values():
+        digest.update(pd.util.hash_pandas_object(df[column].astype(str), index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def content_fingerprint(df):
+    """Hash of every column and value of a catalog (plus the sklearn version).
+
+    Unlike `version`, which counts publishes in this process, it is the same
+    in every worker and across restarts for the same catalog, so it can key
+    anything a client holds on to (ETags).
+    """
+    digest = hashlib.sha1(sklearn.__version__.encode("utf-8"))
+    digest.update(json.dumps([str(col) for col in df.columns]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def load_artifacts(key):
+    """[(vectorizer, matrix)] for tag/product/category from ARTIFACT_DIR/<key>, or None"""
+    path = os.path.join(ARTIFACT_DIR, key)
+    try:
+        with open(os.path.join(path, "vectorizers.pkl"), "rb") as f:
+            vectorizers = pickle.load(f)
+        return [(vectorizers[name], sp.load_npz(os.path.join(path, f"{name}.npz")).tocsr()) for name in VECTOR_COLUMNS]
+    except Exception:
+        return None
 
-    print("🔄 Building TF-IDF vectorizers...")
+def save_artifacts(key, fitted):
+    """Write [(vectorizer, matrix)] for tag/product/category to ARTIFACT_DIR/<key> atomically; drop older versions"""
+    path = os.path.join(ARTIFACT_DIR, key)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    fitted = dict(zip(VECTOR_COLUMNS, fitted))
+    for name, (_, matrix) in fitted.items():
+        sp.save_npz(os.path.join(tmp, f"{name}.npz"), matrix, compressed=False)
+    with open(os.path.join(tmp, "vectorizers.pkl"), "wb") as f:
+        pickle.dump({name: vec for name, (vec, _) in fitted.items()}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    for name in os.listdir(ARTIFACT_DIR):
+        if name != key and not name.endswith(".tmp"):   # leave other builds' temp dirs alone
+            shutil.rmtree(os.path.join(ARTIFACT_DIR, name), ignore_errors=True)
 
-    # Fill missing values
-    workable_dataset["Tags"] = workable_dataset["Tags"].fillna("")
-    workable_dataset["title"] = workable_dataset["title"].fillna("")
-    workable_dataset["category_name"] = workable_dataset["category_name"].fillna("")
+def build_price_index(df):
+    """Row positions sorted by price, overall and per category (rows without a price are left out)"""
+    if "price" not in df.columns:
+        return None
+    prices = pd.to_numeric(df["price"], errors="coerce").to_numpy(dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(prices))
+    rows = valid[np.argsort(prices[valid], kind="stable")]
+    index = {"prices": prices[rows], "rows": rows, "by_category": {}}
+    if "category_name" in df.columns:
+        categories = pd.Series(df["category_name"].to_numpy()[rows])
+        for category, positions in categories.groupby(categories, sort=False).indices.items():
+            index["by_category"][category] = (index["prices"][positions], rows[positions])
+    return index
 
-    # Tag vectorizer
-    vectorizer = TfidfVectorizer(stop_words='english')
-    tag_vectors = vectorizer.fit_transform(workable_dataset["Tags"])
+def price_window(index, low, high, category=None):
+    """(prices, rows) in price order with low <= price <= high: two binary searches"""
+    if category is None:
+        prices, rows = index["prices"], index["rows"]
+    elif category in index["by_category"]:
+        prices, rows = index["by_category"][category]
+    else:
+        return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.int64)
+    start = np.searchsorted(prices, low, side="left")
+    end = np.searchsorted(prices, high, side="right")
+    return prices[start:end], rows[start:end]
 
-    # Title vectorizer
-    product_vectorizer = TfidfVectorizer(stop_words='english')
-    product_vectors = product_vectorizer.fit_transform(workable_dataset["title"])
+def postings_similarity(query_vec, index):
+    """Cosine similarity of one query against the catalog via postings lists.
 
-    # Category vectorizer
-    category_vectorizer = TfidfVectorizer(stop_words='english')
-    category_vectors = category_vectorizer.fit_transform(workable_dataset["category_name"])
+    TF-IDF rows are L2-normalised, so the dot product equals cosine similarity;
+    only rows sharing a term with the query are touched. Returns (rows, scores)
+    with rows sorted and every score > 0.
+    """
+    query_vec = query_vec.tocsr()
+    terms, weights = query_vec.indices, query_vec.data
+    if terms.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    starts, ends = index.indptr[terms], index.indptr[terms + 1]
+    rows = np.concatenate([index.indices[a:b] for a, b in zip(starts, ends)])
+    values = np.concatenate([index.data[a:b] * w for a, b, w in zip(starts, ends, weights)])
+    rows, inverse = np.unique(rows, return_inverse=True)
+    scores = np.bincount(inverse, weights=values, minlength=rows.size)
+    keep = scores > 0
+    return rows[keep].astype(np.int64), scores[keep]
 
-    print("✅ TF-IDF vectorizers ready!")
+def read_cache_file():
+    """The parquet cache in the compact in-memory schema"""
+    return compact_catalog(pd.read_parquet(CACHE_FILE, engine="pyarrow"))
 
-def refresh_cache():
-    """Reload from DB, preprocess, save to disk, and rebuild vectorizers"""
-    global workable_dataset
+def read_cache_snapshot():
+    """Snapshot of the cache file, tagged with the signature saved alongside it"""
+    # Signature before data: the writer replaces the file first, so a racing
+    # read can only pair new data with an old signature (re-read next check)
+    signature = load_signature()
+    return build_snapshot(read_cache_file()).replace(signature=signature)
+
+@contextlib.contextmanager
+def _cache_file_lock():
+    """Exclusive across the processes sharing CACHE_FILE (flock; a no-op where fcntl is missing)"""
+    with open(LOCK_FILE, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def stream_cache(signature, progress=None):
+    """Stream the DB into CACHE_FILE and save `signature` with it; returns the row count.
+
+    Only one process streams at a time. One that waited for the lock and
+    finds the cache already written at `signature` reuses it (returns None).
+    """
     if not mongo_uri:
         raise ValueError("MONGO_URI not found in environment. Cannot refresh cache from DB.")
-    df = load_workable_data()
-    workable_dataset = preprocess_dataset(df)
+    with _cache_file_lock():
+        if signature == load_signature() and os.path.exists(CACHE_FILE):
+            return None
+        # Stream projected batches straight into the parquet cache
+        rows = write_catalog_parquet(CACHE_FILE, progress=progress)
+        save_signature(signature)
+        return rows
 
-    # Convert IDs to strings for parquet compatibility
-    for col in ["product_id", "_id"]:
-        if col in workable_dataset.columns:
-            workable_dataset[col] = workable_dataset[col].astype(str)
+def refresh_cache(progress=None):
+    """Reload from DB, preprocess, save to disk, rebuild vectorizers and publish the new snapshot"""
+    # Signature first: a write landing mid-stream shows up as a change next check
+    rows = stream_cache(catalog_signature(), progress=progress)
+    snapshot = publish(read_cache_snapshot())
+    print(f"✅ Cache refreshed & saved to disk! ({len(snapshot.workable_dataset)} rows"
+          f"{'' if rows is not None else ', written by another process'})")
+    return snapshot
 
-    # Save locally
-    workable_dataset.to_parquet(CACHE_FILE, index=False, engine="pyarrow")
-    print("✅ Cache refreshed & saved to disk!")
+# --------------------------
+# Change signatures
+# --------------------------
+# Maintained by the Product model's timestamps; the max _id still catches inserts without it
+UPDATED_FIELD = os.getenv("CATALOG_UPDATED_FIELD", "updatedAt")
 
-    # Build vectorizers
-    process_vectorizers()
+def ensure_signature_index():
+    """Index UPDATED_FIELD so its max is one index read, not a collection scan and sort"""
+    collection.create_index([(UPDATED_FIELD, -1)])
+
+def _max_value(field):
+    # Served from an index: _id's own, and ensure_signature_index() for UPDATED_FIELD
+    doc = collection.find_one({field: {"$exists": True}}, {field: 1}, sort=[(field, -1)])
+    return None if doc is None else str(doc[field])
+
+def catalog_signature():
+    """Cheap change markers of the products collection: document count, max updated marker, max _id"""
+    return {
+        "count": collection.estimated_document_count(),
+        "max_updated": _max_value(UPDATED_FIELD),
+        "max_id": _max_value("_id"),
+    }
+
+def load_signature():
+    try:
+        with open(SIGNATURE_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_signature(signature):
+    tmp = f"{SIGNATURE_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(signature, f)
+    os.replace(tmp, SIGNATURE_FILE)
+
+# --------------------------
+# Background rebuild
+# --------------------------
+REBUILD_SOURCES = ("db", "cache")
+
+# Progress of the latest background rebuild; replaced as a whole, never mutated
+rebuild_status = {"state": "idle"}
+_rebuild_lock = threading.Lock()
+
+def _report(**fields):
+    global rebuild_status
+    rebuild_status = {**rebuild_status, **fields}
+
+def _begin_rebuild(source):
+    _report(state="running", source=source, started_at=time.time(), finished_at=None,
+            stage="starting", rows_loaded=None, rows=None, version=None, error=None)
+
+def _run_rebuild(source, signature=None):
+    """Rebuild and publish; the caller holds _rebuild_lock, released here. True on success"""
+    try:
+        _report(stage="loading")
+        if source == "db":
+            stream_cache(signature or catalog_signature(), progress=lambda rows: _report(rows_loaded=rows))
+        signature = load_signature()
+        df = read_cache_file()
+        _report(stage="vectorizing", rows=len(df))
+        snapshot = build_snapshot(df).replace(signature=signature)
+        _report(stage="publishing")
+        snapshot = publish(snapshot)
+        _report(state="done", stage=None, version=snapshot.version, finished_at=time.time())
+        print(f"✅ Catalog rebuilt from {source} (version {snapshot.version}, {len(df)} rows)")
+        return True
+    except Exception as e:
+        _report(state="failed", error=str(e), finished_at=time.time())
+        print("⚠ Catalog rebuild failed:", e)
+        return False
+    finally:
+        _rebuild_lock.release()
+
+def start_rebuild(source="db"):
+    """Rebuild the catalog from `source` ("db" or "cache") on a background thread.
+
+    Requests keep reading the current snapshot until the new one is
+    published. Returns False if a rebuild is already running.
+    """
+    if source not in REBUILD_SOURCES:
+        raise ValueError(f"source must be one of {', '.join(REBUILD_SOURCES)}")
+    if not _rebuild_lock.acquire(blocking=False):
+        return False
+    _begin_rebuild(source)
+    threading.Thread(target=_run_rebuild, args=(source,), name="catalog-rebuild", daemon=True).start()
+    return True
+
+# --------------------------
+# Scheduled refresh
+# --------------------------
+# Seconds between change checks; 0 disables the scheduler
+REFRESH_INTERVAL = float(os.getenv("CATALOG_REFRESH_INTERVAL", "0"))
+
+# Outcome of the scheduled checks; replaced as a whole, never mutated
+refresh_status = {
+    "interval": REFRESH_INTERVAL, "checks": 0, "refreshes": 0,
+    "last_check_at": None, "last_change_at": None,
+    "last_refresh_at": None, "last_refresh_seconds": None, "last_error": None,
+}
+
+def _report_refresh(**fields):
+    global refresh_status
+    refresh_status = {**refresh_status, **fields}
+
+def check_and_refresh():
+    """Rebuild if the DB signature differs from the one this process's catalog was read at.
+
+    Returns True if a rebuild ran and succeeded. Workers share the cache
+    file: when it already holds the new signature (a peer streamed it),
+    the catalog is reloaded from the cache; otherwise from the DB, by
+    whichever process gets the cache lock first. Skipped while another
+    rebuild (e.g. an admin one) is running here. A cache file without a
+    saved signature (written before signatures existed) is taken as
+    current: the first check records the signature instead of re-reading
+    the collection, and later changes are picked up as usual.
+    """
+    signature = catalog_signature()
+    _report_refresh(checks=refresh_status["checks"] + 1, last_check_at=time.time(), last_error=None)
+    catalog = current
+    if catalog is not None and signature == catalog.signature:
+        return False
+    stored = load_signature()
+    if stored is None and catalog is not None and catalog.signature is None and os.path.exists(CACHE_FILE):
+        save_signature(signature)
+        publish(catalog.replace(signature=signature), base=catalog)
+        print(f"📌 Recorded catalog signature for the existing cache ({signature['count']} products)")
+        return False
+    source = "cache" if signature == stored else "db"
+    if not _rebuild_lock.acquire(blocking=False):
+        return False
+    print(f"🔄 Catalog changed ({signature['count']} products), refreshing from {source}...")
+    _report_refresh(last_change_at=time.time())
+    _begin_rebuild(source)
+    started = time.perf_counter()
+    if not _run_rebuild(source, signature):
+        _report_refresh(last_error=rebuild_status.get("error"))
+        return False
+    _report_refresh(refreshes=refresh_status["refreshes"] + 1, last_refresh_at=time.time(),
+                    last_refresh_seconds=round(time.perf_counter() - started, 3))
+    return True
+
+def _refresh_loop(interval, stop):
+    try:
+        ensure_signature_index()
+    except Exception as e:   # checks still work, just without the index
+        print("⚠ Could not index the catalog updated marker:", e)
+    while not stop.wait(interval):
+        try:
+            check_and_refresh()
+        except Exception as e:   # Mongo unreachable etc.; try again next tick
+            _report_refresh(last_error=str(e))
+            print("⚠ Catalog change check failed:", e)
+
+def start_refresh_scheduler(interval=None):
+    """Run check_and_refresh() every `interval` seconds on a daemon thread; returns (thread, stop_event)"""
+    interval = interval or REFRESH_INTERVAL
+    _report_refresh(interval=interval)
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=_refresh_loop, args=(interval, stop), name="catalog-refresh", daemon=True,
+    )
+    thread.start()
+    return thread, stop
 
 # --------------------------
 # Main: Load dataset
 # --------------------------
-if os.path.exists(CACHE_FILE):
+# CATALOG_SNAPSHOT=1: open the shared memory-mapped snapshot (see snapshot.py) when one exists
+USE_SNAPSHOT = os.getenv("CATALOG_SNAPSHOT") == "1"
+
+def _load_from_snapshot():
+    from . import snapshot
+    if snapshot.current_version() is None:
+        return False
+    try:
+        snapshot.install(snapshot.load_snapshot())
+        return True
+    except Exception as e:
+        print("⚠ Failed to load catalog snapshot, falling back to the cache file...", e)
+        return False
+
+if USE_SNAPSHOT and _load_from_snapshot():
+    pass
+elif os.path.exists(CACHE_FILE):
     try:
-        workable_dataset = pd.read_parquet(CACHE_FILE, engine="pyarrow")
-        print("📂 Loaded dataset from cache file")
-        print("ℹ Dataset info:")
-        print(workable_dataset.info())
-        process_vectorizers()
+        snapshot = publish(read_cache_snapshot())
+        print(f"📂 Loaded dataset from cache file ({len(snapshot.workable_dataset)} rows)")
     except Exception as e:
         print("⚠ Failed to load cache, refreshing from DB...", e)
         refresh_cache()
@@ -1,7 +1,8 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request, g, Response
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
+import time
 
 load_dotenv()
 
@@ -12,8 +13,76 @@ CORS(app, supports_credentials=True)
 # Register recommendations blueprint
 from Recommendation.allRecommendations import bp as recommendations_bp
 from Recommendation.User_data import bp as user_bp
+from Recommendation.motivation import bp as motivation_bp
+from Recommendation.admin import bp as admin_bp
 app.register_blueprint(recommendations_bp)
 app.register_blueprint(user_bp)
+app.register_blueprint(motivation_bp)
+app.register_blueprint(admin_bp)
+
+# Optional: patch the catalog incrementally from the products change stream
+if os.getenv("CATALOG_CHANGE_STREAM") == "1":
+    from Recommendation.catalog_updates import start_change_stream
+    start_change_stream()
+
+# Optional: rebuild the catalog when the products collection changes, checked every N seconds
+if float(os.getenv("CATALOG_REFRESH_INTERVAL", "0")) > 0:
+    from Recommendation.workable_data import start_refresh_scheduler
+    start_refresh_scheduler()
+
+# Optional: serve the shared memory-mapped catalog snapshot and follow new versions
+if os.getenv("CATALOG_SNAPSHOT") == "1":
+    from Recommendation.snapshot import start_follower
+    start_follower()
+
+# Every request reads one catalog snapshot start to finish, even if a rebuild
+# publishes a new one halfway through
+from Recommendation import workable_data
+
+@app.before_request
+def pin_catalog():
+    g.catalog_token = workable_data.pin()
+
+@app.teardown_request
+def unpin_catalog(exc):
+    token = g.pop("catalog_token", None)
+    if token is not None:
+        workable_data.unpin(token)
+
+# Optional: stage timers and cache counters in Prometheus text format (METRICS_ENABLED=1)
+from Recommendation import metrics
+if metrics.ENABLED:
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_time(response):
+        if "request_started" in g:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            metrics.observe(route, time.perf_counter() - g.request_started, family="request")
+        return response
+
+@app.get("/metrics")
+def metrics_endpoint():
+    if not metrics.ENABLED:
+        return jsonify(error="metrics disabled"), 404
+    from Recommendation.User_data import user_cache
+    from Recommendation.Existing_User_home_page import home_cache
+    from Recommendation.ranking import snapshots
+    catalog = workable_data.catalog()
+    body = metrics.render(
+        caches={"users": user_cache, "home": home_cache, "snapshots": snapshots},
+        gauges={
+            "recommender_catalog_products": ("Products in the loaded catalog", 0 if catalog is None else len(catalog.workable_dataset)),
+            "recommender_catalog_version": ("Bumped every time the catalog or its indexes are rebuilt", 0 if catalog is None else catalog.version),
+        },
+    )
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
+# Asyncio serving mode: uvicorn app:asgi_app (see Recommendation/async_serving.py)
+from Recommendation.async_serving import AsyncApp
+asgi_app = AsyncApp(app)
 
 @app.get("/health")
 def health():
@@ -0,0 +1,196 @@
+"""Per-request cart_alternatives latency on a synthetic catalog, before and after.
+
+    python -m benchmarks.cart_latency --products 100000 --requests 50
+
+"before_ms" runs legacy_cart_alternatives, the function as it was before
+title vectors were reused (it refits a TfidfVectorizer on every title per
+request); "after_ms" runs the current cart_alternatives. Both are timed end
+to end on the same catalog and products, alternating per request, and
+"same_results" is the share of requests where both return the same ids.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from .synthetic import make_catalog, percentiles
+
+
+def legacy_cart_alternatives(profile, product_id, df, top_k=10, max_results=None):
+    """cart_alternatives before the title-vector reuse; only the imports and commented-out code differ"""
+    from Recommendation import workable_data
+    from Recommendation.common_code import score_products
+    from Recommendation.Existing_User_cart import _to_jsonable
+    from Recommendation.ranking import top_k_indices
+
+    # Validate inputs
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return []
+    if not product_id or "product_id" not in df.columns:
+        return []
+
+    # Normalize for comparison
+    product_id = str(product_id)
+    catalog = df
+    df = df.copy()
+    df["product_id"] = df["product_id"].astype(str)
+
+    if product_id not in df["product_id"].values:
+        return []
+
+    # Profile defaults
+    weights = (profile or {}).get("weights", {}) if isinstance(profile, dict) else {}
+    price_tolerance = float((profile or {}).get("price_tolerance", 0.2))
+
+    def _scores(frame):
+        try:
+            return score_products(frame, weights)
+        except Exception:
+            return np.zeros(len(frame), dtype=np.float32)
+
+    # Target item row
+    ids = df["product_id"].to_numpy()
+    item_pos = int(np.flatnonzero(ids == product_id)[0])
+    df_cart_item = df.iloc[item_pos]
+    item_name = df_cart_item.get("title", "")
+    item_category = df_cart_item.get("category_name", df_cart_item.get("category", ""))
+    item_price = float(df_cart_item.get("price", 0) or 0)
+    item_score = float(_scores(df.iloc[[item_pos]])[0])
+
+    # Price range widening over the sorted price index: score only the widest
+    # window once, then each tolerance step is two binary searches.
+    tolerances = []
+    tol = price_tolerance
+    while tol <= 0.5:
+        tolerances.append(tol)
+        tol += 0.05
+
+    selected = None
+    if tolerances:
+        if catalog is workable_data.workable_dataset and workable_data.price_index is not None:
+            index = workable_data.price_index
+        else:
+            index = workable_data.build_price_index(df)
+        widest = tolerances[-1]
+        prices, window = workable_data.price_window(index, item_price * (1 - widest), item_price * (1 + widest))
+        window_scores = _scores(df.iloc[window])
+        better = (window_scores >= item_score) & (ids[window] != product_id)
+        prices, rows, row_scores = prices[better], window[better], window_scores[better]
+        for tol in tolerances:
+            start = np.searchsorted(prices, item_price * (1 - tol), side="left")
+            end = np.searchsorted(prices, item_price * (1 + tol), side="right")
+            if end - start >= top_k:
+                selected = (rows[start:end], row_scores[start:end])
+                break
+
+    if selected is None:
+        # No window reached top_k: fall back to every better alternative
+        all_scores = _scores(df)
+        better = (all_scores >= item_score) & (ids != product_id)
+        selected = (np.flatnonzero(better), all_scores[better])
+
+    rows, row_scores = selected
+    order = np.argsort(rows, kind="stable")   # back to catalog order
+    better_alts = df.iloc[rows[order]].copy()
+    row_scores = row_scores[order]
+    better_alts["sustainability_score"] = row_scores
+    if better_alts.empty:
+        return []
+
+    # Name similarity
+    try:
+        vec = TfidfVectorizer()
+        vec.fit(df["title"].fillna("").astype(str).tolist())
+        item_vec = vec.transform([str(item_name)])
+        alt_vecs = vec.transform(better_alts["title"].fillna("").astype(str).tolist())
+        better_alts["name_similarity"] = cosine_similarity(alt_vecs, item_vec).flatten()
+    except Exception:
+        better_alts["name_similarity"] = 0.0
+
+    # Category similarity
+    cat_col = "category_name" if "category_name" in better_alts.columns else ("category" if "category" in better_alts.columns else None)
+    if cat_col:
+        better_alts["category_score"] = better_alts[cat_col].apply(
+            lambda c: 1.0 if c == item_category
+            else 0.5 if str(item_category) in str(c) or str(c) in str(item_category)
+            else 0.0
+        )
+    else:
+        better_alts["category_score"] = 0.0
+
+    # Normalize sustainability (0..1)
+    try:
+        better_alts["sustainability_scaled"] = better_alts["sustainability_score"] / 5.0
+    except Exception:
+        better_alts["sustainability_scaled"] = 0.0
+
+    # Final score
+    better_alts["final_score"] = (
+        0.5 * better_alts["name_similarity"] +
+        0.2 * better_alts["category_score"] +
+        0.3 * better_alts["sustainability_scaled"]
+    )
+
+    # Top-K
+    top = top_k_indices(better_alts["final_score"].to_numpy(), max_results or top_k)
+    better_alts = better_alts.iloc[top]
+    better_alts["original_item"] = item_name
+
+    id_col = "_id" if "_id" in better_alts.columns else ("product_id" if "product_id" in better_alts.columns else None)
+    if not id_col:
+        return []
+
+    # Return only the ID column as a JSON-safe list
+    ids = better_alts[id_col].tolist()
+    return [_to_jsonable(v) for v in ids]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="cart_bench_")
+    catalog = make_catalog(args.products, args.seed)
+    cache_file = os.path.join(workdir, "workable_dataset.parquet")
+    catalog.to_parquet(cache_file, index=False)
+    os.environ["WORKABLE_CACHE_FILE"] = cache_file
+
+    from Recommendation import workable_data
+    from Recommendation.Existing_User_cart import cart_alternatives
+
+    df = workable_data.catalog().workable_dataset
+    rng = np.random.default_rng(args.seed)
+    product_ids = df["product_id"].iloc[rng.integers(0, len(df), args.requests)].tolist()
+    profile = {"weights": {"carbon": 0.4, "water": 0.3, "rating": 0.3}, "price_tolerance": 0.2}
+
+    before, after, same = [], [], 0
+    for product_id in product_ids:
+        start = time.perf_counter()
+        old = legacy_cart_alternatives(profile, product_id, df, top_k=10)
+        before.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        new = cart_alternatives(profile, product_id, df, top_k=10)
+        after.append((time.perf_counter() - start) * 1000)
+        same += list(map(str, old)) == list(map(str, new))
+
+    report = {
+        "products": len(df),
+        "requests": len(product_ids),
+        "before_ms": percentiles(before),
+        "after_ms": percentiles(after),
+        "same_results": round(same / max(len(product_ids), 1), 3),
+    }
+    report["speedup_p50"] = round(report["before_ms"]["p50_ms"] / report["after_ms"]["p50_ms"], 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
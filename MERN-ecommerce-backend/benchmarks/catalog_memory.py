@@ -0,0 +1,66 @@
+"""Memory footprint of the catalog before and after compact_catalog.
+
+    python -m benchmarks.catalog_memory --products 500000
+
+"Before" is the catalog as it used to sit in memory: text as object columns
+and numbers as float64. "After" is the same frame through
+workable_data.compact_catalog. Sizes are memory_usage(deep=True) in MB, per
+column and in total; "cart_copy_mb" is what every cart request used to
+allocate for its df.copy() plus product_id.astype(str).
+"""
+import argparse
+import json
+import os
+import tempfile
+from .synthetic import make_catalog
+
+
+def legacy_frame(df):
+    """The old in-memory layout: object text columns, float64 numbers"""
+    legacy = df.copy()
+    for col in legacy.columns:
+        if legacy[col].dtype.kind in "fi":
+            legacy[col] = legacy[col].astype("float64")
+        else:
+            legacy[col] = legacy[col].astype(object)
+    return legacy
+
+
+def footprint(df):
+    usage = df.memory_usage(deep=True, index=False)
+    return {col: round(int(size) / 2**20, 2) for col, size in usage.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=500_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # workable_data loads its cache on import; give it a small one
+    workdir = tempfile.mkdtemp(prefix="memory_bench_")
+    cache_file = os.path.join(workdir, "workable_dataset.parquet")
+    make_catalog(1000, args.seed).to_parquet(cache_file, index=False)
+    os.environ["WORKABLE_CACHE_FILE"] = cache_file
+    from Recommendation import workable_data
+
+    before = legacy_frame(make_catalog(args.products, args.seed))
+    after = workable_data.compact_catalog(before.copy())
+    before_mb, after_mb = footprint(before), footprint(after)
+
+    report = {
+        "products": len(before),
+        "columns": {
+            col: {"before_mb": before_mb[col], "after_mb": after_mb[col], "dtype": str(after[col].dtype)}
+            for col in before.columns
+        },
+        "before_mb": round(sum(before_mb.values()), 2),
+        "after_mb": round(sum(after_mb.values()), 2),
+        "cart_copy_mb": round(sum(before_mb.values()) + before_mb["product_id"], 2),
+    }
+    report["reduction"] = round(report["before_mb"] / report["after_mb"], 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
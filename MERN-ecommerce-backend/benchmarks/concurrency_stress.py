@@ -0,0 +1,118 @@
+"""Concurrency stress test for the recommendation endpoints.
+
+    python -m benchmarks.concurrency_stress --threads 32 --requests 2000
+
+Serves app.py from a threaded WSGI server on a synthetic catalog, seeds the
+user cache with synthetic users, and fires home/search/cart requests for
+random users from many threads. Every response must equal the one computed
+for that user sequentially beforehand; exits non-zero on any mismatch.
+
+The home and response-body caches are disabled for the run, so every
+request, expected or concurrent, is ranked from scratch rather than served
+from what the sequential pass stored.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .synthetic import make_catalog, make_users, percentiles, ADJECTIVES, NOUNS
+
+
+def user_requests(user, product_ids, rng):
+    """Paths this user will request: home, one search and one cart lookup"""
+    query = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+    return [
+        "/api/recommendations/home",
+        f"/api/recommendations/search?soap={urllib.parse.quote(query)}",
+        f"/api/recommendations/cart/{rng.choice(product_ids)}",
+    ]
+
+
+def fetch(base_url, path, user_id):
+    req = urllib.request.Request(base_url + path, headers={"X-User-Id": user_id})
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="stress_bench_")
+    catalog = make_catalog(args.products, args.seed)
+    cache_file = os.path.join(workdir, "workable_dataset.parquet")
+    catalog.to_parquet(cache_file, index=False)
+    os.environ["WORKABLE_CACHE_FILE"] = cache_file
+    os.environ["HOME_CACHE_SIZE"] = "0"
+    os.environ["RESPONSE_CACHE_SIZE"] = "0"
+
+    from werkzeug.serving import make_server
+    from app import app
+    from Recommendation import User_data as user_data
+    from Recommendation.Existing_User_home_page import home_cache
+    from Recommendation.responses import bodies
+
+    rng = np.random.default_rng(args.seed)
+    product_ids = catalog["product_id"].to_numpy()
+    users = make_users(args.users, product_ids, args.seed)
+    for user_id, user in users.items():
+        user_data.user_cache.set(user_id, user, ttl=24 * 3600)
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    # Expected answers, one request at a time
+    calls = [(user_id, path) for user_id in users for path in user_requests(users[user_id], product_ids, rng)]
+    expected = {call: fetch(base_url, call[1], call[0]) for call in calls}
+
+    picks = [calls[i] for i in rng.integers(0, len(calls), args.requests)]
+    latencies, mismatches = [], []
+
+    def run(call):
+        start = time.perf_counter()
+        got = fetch(base_url, call[1], call[0])
+        latencies.append((time.perf_counter() - start) * 1000)
+        if got != expected[call]:
+            mismatches.append({"user": call[0], "path": call[1], "status": got[0]})
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(run, picks))
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    report = {
+        "products": args.products,
+        "users": args.users,
+        "threads": args.threads,
+        "requests": len(picks),
+        "requests_per_s": round(len(picks) / elapsed, 1),
+        "latency": percentiles(latencies),
+        "mismatches": len(mismatches),
+        "result_cache_hits": home_cache.hits + bodies.hits,
+        "examples": mismatches[:5],
+    }
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Tag-extraction throughput of preprocess_dataset on a synthetic raw catalog.
+
+    python -m benchmarks.preprocess_throughput --products 200000 --processes 4
+
+"Before" is the old per-cell Series.apply(clean_and_extract_tags) plus the
+row-wise Tags join, timed on the first --legacy-rows rows and extrapolated
+per row (it is linear and too slow to run on 200k rows). "After" is the
+current preprocess_dataset on every row. Tags are compared on the sample.
+"""
+import argparse
+import json
+import time
+from .synthetic import make_raw_catalog
+
+
+def legacy_preprocess(df, clean_and_extract_tags):
+    columns = ["title", "brand", "category_name"]
+    for column in columns:
+        df[column] = df[column].apply(clean_and_extract_tags)
+    df["Tags"] = df[columns].apply(lambda row: ", ".join(row), axis=1)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--legacy-rows", type=int, default=5_000)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from Recommendation import workable_data
+
+    raw = make_raw_catalog(args.products, args.seed)
+    sample = raw.head(args.legacy_rows).copy()
+    workable_data.get_nlp()   # model load is not part of either timing
+
+    start = time.perf_counter()
+    before = legacy_preprocess(sample.copy(), workable_data.clean_and_extract_tags)
+    legacy_per_row = (time.perf_counter() - start) / len(sample)
+
+    workable_data.SPACY_PROCESSES = args.processes
+    workable_data.SPACY_BATCH_SIZE = args.batch_size
+    start = time.perf_counter()
+    after = workable_data.preprocess_dataset(raw.copy())
+    after_s = time.perf_counter() - start
+
+    columns = ["title", "brand", "category_name", "Tags"]
+    identical = after.head(len(before))[columns].equals(before[columns])
+    before_s = legacy_per_row * len(raw)
+    report = {
+        "products": len(raw),
+        "distinct": {c: int(raw[c].nunique()) for c in ["title", "brand", "category_name"]},
+        "processes": args.processes,
+        "before_s_estimated": round(before_s, 2),
+        "after_s": round(after_s, 2),
+        "rows_per_s": round(len(raw) / after_s),
+        "speedup": round(before_s / after_s, 1),
+        "identical_tags": bool(identical),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
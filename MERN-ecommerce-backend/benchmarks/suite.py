@@ -0,0 +1,177 @@
+"""Benchmark suite for the recommenders on synthetic catalogs, without Mongo.
+
+    python -m benchmarks.suite --sizes 10000,100000,1000000
+    python -m benchmarks.suite --sizes 100000 --baseline benchmarks/results/<earlier>.json
+
+For every catalog size it times process_vectorizers (a fresh fit; persisted
+artifacts are not reused), search_based_recommendation, cart_alternatives,
+user_home_page_recommendations (home cache cleared before each call, so
+every call computes) and preprocess_dataset on a raw copy of the catalog.
+
+Per stage the report holds latency percentiles from an untraced run and the
+tracemalloc peak (MB) of a separate traced run over a few of the same calls.
+Results are written as JSON to --output (default benchmarks/results/);
+--baseline prints the p50 ratio of every stage against an earlier run.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import sklearn
+from .synthetic import make_catalog, make_raw_catalog, make_users, percentiles, ADJECTIVES, NOUNS
+
+STAGES = ["process_vectorizers", "search", "cart", "home", "preprocess"]
+TRACED_CALLS = 5
+
+
+def measure(fn, calls):
+    """Percentiles of fn(*call) over every call, plus the traced peak of the first few"""
+    latencies = []
+    for call in calls:
+        start = time.perf_counter()
+        fn(*call)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    for call in calls[:TRACED_CALLS]:
+        fn(*call)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    report = percentiles(latencies)
+    report["peak_mb"] = round(peak / 2**20, 2)
+    return report
+
+
+def run_size(n, args, workable_data, workdir):
+    """Every stage on one synthetic catalog of n products"""
+    from Recommendation.Existing_User_search import search_based_recommendation
+    from Recommendation.Existing_User_cart import cart_alternatives
+    from Recommendation.Existing_User_home_page import user_home_page_recommendations, home_cache
+
+    rng = np.random.default_rng(args.seed)
+    catalog = make_catalog(n, args.seed)
+    results = {}
+
+    def fit():
+        workable_data.workable_dataset = workable_data.compact_catalog(catalog.copy())
+        # A fresh directory per fit, so no run loads the previous one's artifacts
+        workable_data.ARTIFACT_DIR = tempfile.mkdtemp(dir=workdir)
+        workable_data.process_vectorizers()
+
+    if "process_vectorizers" in args.stages:
+        results["process_vectorizers"] = measure(fit, [()] * args.fits)
+    else:
+        fit()
+    df = workable_data.workable_dataset
+
+    product_ids = df["product_id"].to_numpy()
+    users = list(make_users(args.users, product_ids, args.seed).values())
+    pick = lambda: users[rng.integers(0, len(users))]
+
+    if "search" in args.stages:
+        calls = [
+            (pick(), f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}", df)
+            for _ in range(args.requests)
+        ]
+        results["search"] = measure(search_based_recommendation, calls)
+
+    if "cart" in args.stages:
+        calls = [(pick(), str(rng.choice(product_ids)), df) for _ in range(args.requests)]
+        results["cart"] = measure(cart_alternatives, calls)
+
+    if "home" in args.stages:
+        def home(user):
+            home_cache.clear()
+            return user_home_page_recommendations(user, df)
+        results["home"] = measure(home, [(pick(),) for _ in range(args.requests)])
+
+    if "preprocess" in args.stages:
+        rows = min(n, args.preprocess_rows)
+        raw = make_raw_catalog(rows, args.seed)
+        try:
+            workable_data.get_nlp()   # model load is not part of the timing
+            results["preprocess"] = measure(lambda: workable_data.preprocess_dataset(raw.copy()), [()])
+            results["preprocess"]["rows"] = rows
+        except OSError as e:
+            results["preprocess"] = {"skipped": f"spaCy model unavailable: {e}"}
+    return results
+
+
+def compare(results, baseline):
+    """{size: {stage: p50 now / p50 in baseline}} for stages present in both runs"""
+    ratios = {}
+    for size, stages in results.items():
+        for stage, report in stages.items():
+            before = baseline.get("results", {}).get(size, {}).get(stage, {})
+            if "p50_ms" in report and before.get("p50_ms"):
+                ratios.setdefault(size, {})[stage] = round(report["p50_ms"] / before["p50_ms"], 3)
+    return ratios
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated catalog sizes")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated subset of " + ",".join(STAGES))
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=100, help="calls per request-path stage")
+    parser.add_argument("--fits", type=int, default=1, help="process_vectorizers runs per size")
+    parser.add_argument("--preprocess-rows", type=int, default=50_000, help="cap on preprocess_dataset rows")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--baseline", default=None, help="earlier results JSON to compare against")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    args.stages = [stage for stage in args.stages.split(",") if stage]
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    # workable_data loads its cache on import; give it a small one
+    workdir = tempfile.mkdtemp(prefix="suite_bench_")
+    cache_file = os.path.join(workdir, "workable_dataset.parquet")
+    make_catalog(1000, args.seed).to_parquet(cache_file, index=False)
+    os.environ["WORKABLE_CACHE_FILE"] = cache_file
+    from Recommendation import workable_data
+
+    started = time.strftime("%Y%m%d-%H%M%S")
+    report = {
+        "meta": {
+            "started": started,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        },
+        "results": {},
+    }
+    for n in sizes:
+        print(f"⏱ {n} products...", file=sys.stderr)
+        report["results"][str(n)] = run_size(n, args, workable_data, workdir)
+    # ru_maxrss is KB on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    report["meta"]["max_rss_mb"] = round(maxrss / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["p50_vs_baseline"] = compare(report["results"], json.load(f))
+
+    output = args.output or os.path.join(os.path.dirname(__file__), "results", f"suite-{started}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"✅ Results written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+# --------------------------
+# Vocabulary for synthetic products
+# --------------------------
+ADJECTIVES = [
+    "organic", "bamboo", "vegan", "natural", "reusable", "recycled", "herbal", "eco",
+    "biodegradable", "compostable", "handmade", "fair", "trade", "cotton", "steel",
+    "glass", "charcoal", "coconut", "solar", "zero", "waste", "plastic", "free",
+]
+NOUNS = [
+    "soap", "toothpaste", "toothbrush", "shampoo", "bottle", "bag", "straw", "cup",
+    "brush", "cream", "lotion", "jar", "lamp", "towel", "wrap", "cutlery", "comb",
+    "deodorant", "sponge", "mat", "notebook", "pen", "candle", "detergent", "tote",
+]
+CATEGORIES = [
+    "personal care", "kitchen", "home decor", "bath", "outdoor", "stationery",
+    "cleaning", "baby care", "pet supplies", "fashion", "garden", "travel",
+]
+GRADES = ["A+", "A", "B", "C", "D", "Unknown"]
+GRADE_WEIGHTS = [0.08, 0.22, 0.30, 0.22, 0.12, 0.06]
+
+
+def _tags(text):
+    """Cheap stand-in for workable_data.clean_and_extract_tags on generated text"""
+    return text.str.lower().str.replace(" ", ",", regex=False)
+
+
+def make_catalog(n, seed=0, n_brands=None):
+    """Synthetic preprocessed catalog shaped like workable_dataset (Tags included)"""
+    rng = np.random.default_rng(seed)
+    n_brands = n_brands or max(50, n // 200)
+    brands = np.array([f"brand{i}" for i in range(n_brands)])
+    # Zipf-like popularity for brands and categories
+    brand_p = 1.0 / np.arange(1, n_brands + 1)
+    brand_p /= brand_p.sum()
+    cat_p = 1.0 / np.arange(1, len(CATEGORIES) + 1) ** 0.7
+    cat_p /= cat_p.sum()
+
+    words = np.array(ADJECTIVES)[rng.integers(0, len(ADJECTIVES), (n, 2))]
+    nouns = np.array(NOUNS)[rng.integers(0, len(NOUNS), n)]
+    titles = pd.Series([f"{a} {b} {c}" for (a, b), c in zip(words, nouns)])
+    brand = pd.Series(rng.choice(brands, n, p=brand_p))
+    category = pd.Series(rng.choice(CATEGORIES, n, p=cat_p))
+
+    df = pd.DataFrame({
+        "_id": [f"{i:024x}" for i in rng.permutation(n)],
+        "product_id": [f"GEN{i}" for i in range(n)],
+        "title": _tags(titles),
+        "brand": _tags(brand),
+        "category_name": _tags(category),
+        "price": np.round(rng.lognormal(5.0, 0.8, n).clip(1, 10000), 2),
+        "rating": np.round(rng.beta(5, 2, n) * 5, 1),
+        "Eco_Rating": rng.choice(GRADES, n, p=GRADE_WEIGHTS),
+        "Water_Rating": rng.choice(GRADES, n, p=GRADE_WEIGHTS),
+    })
+    df["Tags"] = df["title"] + ", " + df["brand"] + ", " + df["category_name"]
+    return df
+
+
+def make_raw_catalog(n, seed=0):
+    """Synthetic catalog before preprocessing (mixed-case text, no Tags column)"""
+    df = make_catalog(n, seed).drop(columns=["Tags"])
+    rng = np.random.default_rng(seed + 1)
+    for col in ["title", "brand", "category_name"]:
+        df[col] = df[col].str.replace(",", " ", regex=False).str.title()
+    df.loc[rng.random(n) < 0.01, "brand"] = None
+    return df
+
+
+def make_users(n, product_ids, seed=0):
+    """Synthetic user profiles with distinct weights, searches and purchases"""
+    rng = np.random.default_rng(seed)
+    users = {}
+    for i in range(n):
+        w = rng.dirichlet([1, 1, 1])
+        users[f"{i:024x}"] = {
+            "_id": f"{i:024x}",
+            "weights": {"rating": float(w[0]), "carbon": float(w[1]), "water": float(w[2])},
+            "price_tolerance": float(rng.choice([0.1, 0.2, 0.3])),
+            "search_history": [
+                f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}" for _ in range(rng.integers(0, 6))
+            ],
+            "purchase_history": [str(p) for p in rng.choice(product_ids, rng.integers(0, 4))],
+        }
+    return users
+
+
+def percentiles(samples_ms):
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "count": int(samples.size),
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p95_ms": round(float(np.percentile(samples, 95)), 3),
+        "p99_ms": round(float(np.percentile(samples, 99)), 3),
+        "mean_ms": round(float(samples.mean()), 3),
+    }
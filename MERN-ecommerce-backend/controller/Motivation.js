@@ -1,8 +1,9 @@
-const { spawn } = require('child_process');
-const path = require('path');
 const { User } = require('../model/User');
 const { Order } = require('../model/Order');
 const { Product } = require('../model/Product');
+const { recommendationClient } = require('../services/recommendationClient');
+
+const FALLBACK_MESSAGE = '✨ Small steps make a big difference. Try one more eco-friendly switch today! 🌍 Every choice matters — start small, change the world. 💡 Even tiny eco-friendly changes ripple into a huge impact.';
 
 function gradeToScore(grade) {
     if (!grade || typeof grade !== 'string') return 0;
@@ -74,38 +75,13 @@ exports.generateMotivation = async (req, res) => {
             price_tolerance: typeof user?.price_tolerance === 'number' ? user.price_tolerance : 0.2,
         };
 
-        const pythonExecutable = process.env.PYTHON || 'python';
-        const recommendationDir = path.join(__dirname, '..', 'recommendation');
-        const pyArgs = [
-            '-c',
-            "import json,sys,io;\n" +
-            "# Ensure UTF-8 output on Windows\n" +
-            "getattr(sys.stdout, 'reconfigure', lambda **k: None)(encoding='utf-8');\n" +
-            "getattr(sys.stderr, 'reconfigure', lambda **k: None)(encoding='utf-8');\n" +
-            "# Suppress top-level prints during import\n" +
-            "buf=io.StringIO(); old=sys.stdout; sys.stdout=buf; import motivation as m; sys.stdout=old;\n" +
-            "data=json.load(sys.stdin); msg=m.generate_motivation(data); print(msg)",
-        ];
-        const child = spawn(pythonExecutable, pyArgs, {
-            cwd: recommendationDir,
-            stdio: ['pipe', 'pipe', 'pipe'],
-            env: { ...process.env, PYTHONIOENCODING: 'utf-8', PYTHONUTF8: '1' },
-        });
-        let stdout = '', stderr = '';
-        child.stdout.on('data', (d) => (stdout += d.toString()));
-        child.stderr.on('data', (d) => (stderr += d.toString()));
-        child.on('error', (err) => console.error('[motivation] spawn error:', err?.message || err));
-        child.on('close', (code) => {
-            if (code !== 0) {
-                console.error('[motivation] python exited with code', code, stderr);
-                return res.status(200).json({
-                    message: '✨ Small steps make a big difference. Try one more eco-friendly switch today! 🌍 Every choice matters — start small, change the world. 💡 Even tiny eco-friendly changes ripple into a huge impact.',
-                    source: 'fallback',
-                });
-            }
-            return res.status(200).json({ message: stdout.trim(), source: 'python' });
-        });
-        try { child.stdin.write(JSON.stringify(profile)); child.stdin.end(); } catch (e) { }
+        try {
+            const { data } = await recommendationClient.post('/api/motivation', profile);
+            return res.status(200).json({ message: data.message, source: 'python' });
+        } catch (err) {
+            console.error('[motivation] recommendation service error:', err?.response?.status || err?.message || err);
+            return res.status(200).json({ message: FALLBACK_MESSAGE, source: 'fallback' });
+        }
     } catch (err) {
         console.error('[motivation] error:', err);
         res.status(200).json({
@@ -38,7 +38,10 @@ const productSchema = new Schema({
   highlights: { type: [String] },
   discountPrice: { type: Number },
   deleted: { type: Boolean, default: false }
-});
+}, { timestamps: true });
+
+// Lets the recommendation service read the latest updatedAt without a collection scan
+productSchema.index({ updatedAt: -1 });
 
 const virtualId = productSchema.virtual('id');
 virtualId.get(function () {
@@ -0,0 +1,17 @@
+const http = require('http');
+const https = require('https');
+const axios = require('axios');
+
+// Base URL of the Flask recommendation service (app.py)
+const RECOMMENDATION_API_URL = process.env.RECOMMENDATION_API_URL || 'http://127.0.0.1:8000';
+
+// One client for the whole process: keep-alive agents reuse TCP connections
+// across requests instead of opening a new one per call.
+const agentOptions = { keepAlive: true, maxSockets: 50, maxFreeSockets: 10 };
+
+exports.recommendationClient = axios.create({
+    baseURL: RECOMMENDATION_API_URL,
+    timeout: Number(process.env.RECOMMENDATION_API_TIMEOUT_MS) || 3000,
+    httpAgent: new http.Agent(agentOptions),
+    httpsAgent: new https.Agent(agentOptions),
+});